@@ -0,0 +1,155 @@
+import json
+import os
+import statistics
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from helpers.localFiles import atomic_write
+
+
+class AdaptiveBatcher:
+    """
+    Groups keyword IDs into ``userId`` batches from what earlier runs
+    learned about them. Every ID keeps an EWMA of the rows it returns per
+    endpoint, and every endpoint keeps an EWMA of request latency (timed
+    from when the request got its host slot, so queueing behind the
+    limiter does not count); sparse IDs are packed together until a batch
+    is expected to fill ``target_pages`` pages, heavy IDs get a batch of
+    their own, and once per run the page target shrinks when requests got
+    slow and grows back when they are fast. Statistics are persisted as
+    JSON between runs.
+    """
+
+    STATS_PATH = Path(os.getenv("BO_BATCH_STATS", ".cache/batch_stats.json"))
+
+    def __init__(
+        self,
+        *,
+        page_size: int = 100,
+        target_pages: int = 5,
+        min_pages: int = 1,
+        max_pages: int = 20,
+        target_latency: float = 2.0,   # seconds per request we are happy with
+        max_ids: int = 50,             # keeps the userId query string sane
+        default_rows: Optional[float] = None,
+        alpha: float = 0.3,            # EWMA weight of the newest observation
+        stats_path: Optional[Path] = None,
+    ):
+        self.page_size = page_size
+        self.min_pages = min_pages
+        self.max_pages = max_pages
+        self.target_latency = target_latency
+        self.max_ids = max_ids
+        self.default_rows = page_size / 2 if default_rows is None else default_rows
+        self.alpha = alpha
+        self.stats_path = Path(stats_path or self.STATS_PATH)
+        self._default_target_pages = target_pages
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = self._load()
+
+    # ────────────────────────────────────────────────────────────
+    # Planning
+    # ────────────────────────────────────────────────────────────
+    def plan(self, endpoint: str, ids: List[str]) -> List[List[str]]:
+        """Split ``ids`` into batches, keeping their order."""
+        key = self._key(endpoint)
+        with self._lock:
+            stats = self._stats.get(key, {})
+            rows = stats.get("rows", {})
+            budget = self._target_pages(stats) * self.page_size
+
+        batches: List[List[str]] = []
+        current: List[str] = []
+        expected = 0.0
+        for uid in ids:
+            estimate = rows.get(uid, self.default_rows)
+            if estimate >= budget:                       # heavy: isolate it
+                if current:
+                    batches.append(current)
+                    current, expected = [], 0.0
+                batches.append([uid])
+                continue
+            if current and (expected + estimate > budget or len(current) >= self.max_ids):
+                batches.append(current)
+                current, expected = [], 0.0
+            current.append(uid)
+            expected += estimate
+        if current:
+            batches.append(current)
+        return batches
+
+    # ────────────────────────────────────────────────────────────
+    # Learning
+    # ────────────────────────────────────────────────────────────
+    def observe_counts(self, endpoint: str, batch: List[str], names: Dict[str, int]) -> None:
+        """Fold one finished batch's ``{affiliateName: rows}`` counts into the per‑ID row averages."""
+        counts = dict.fromkeys(batch, 0.0)
+        lookup = {uid.lower(): uid for uid in batch}
+        unattributed = 0
+        for name, n in names.items():
+            uid = lookup.get(name.lower())
+            if uid is None:
+                unattributed += n
+            else:
+                counts[uid] += n
+        if unattributed:                                 # rows we cannot pin to an ID
+            share = unattributed / len(batch)
+            for uid in counts:
+                counts[uid] += share
+
+        key = self._key(endpoint)
+        with self._lock:
+            stats = self._stats.setdefault(key, {"rows": {}, "latency": None, "target_pages": None})
+            for uid, n in counts.items():
+                stats["rows"][uid] = self._ewma(stats["rows"].get(uid), n)
+
+    def observe_run(self, endpoint: str, latencies: List[float]) -> None:
+        """
+        Fold one run's request latencies into the endpoint's average and
+        move the page target once. A run served entirely from cache or the
+        journal (no latencies) leaves both alone.
+        """
+        if not latencies:
+            return
+        key = self._key(endpoint)
+        with self._lock:
+            stats = self._stats.setdefault(key, {"rows": {}, "latency": None, "target_pages": None})
+            stats["latency"] = self._ewma(stats["latency"], statistics.median(latencies))
+
+            # AIMD‑ish page target: back off fast on slow requests, creep up otherwise
+            target = self._target_pages(stats)
+            if stats["latency"] > self.target_latency:
+                target = max(self.min_pages, target // 2)
+            else:
+                target = min(self.max_pages, target + 1)
+            stats["target_pages"] = target
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._stats)
+        try:
+            atomic_write(self.stats_path, data)
+        except OSError as e:
+            print(f"[batcher] could not persist stats ({e})")
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    @staticmethod
+    def _key(endpoint: str) -> str:
+        parts = urlsplit(endpoint)
+        return f"{parts.netloc}{parts.path}"
+
+    def _target_pages(self, stats: Dict[str, Any]) -> int:
+        return stats.get("target_pages") or self._default_target_pages
+
+    def _ewma(self, old: Optional[float], new: float) -> float:
+        return new if old is None else (1 - self.alpha) * old + self.alpha * new
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.stats_path.read_text())
+        except (OSError, ValueError):
+            return {}
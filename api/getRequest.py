@@ -1,120 +1,486 @@
+import asyncio
+import contextvars
+import hashlib
+import json
 import logging
+import math
+import os
+import queue
+import threading
 import time
 import traceback
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from collections import Counter
+from typing import Callable, Iterator, List, Dict, Any, Optional, Sequence, Tuple
 
 import requests
 
-class BoDataAPI:
+from api.batchPlanner import AdaptiveBatcher
+from api.responseCache import ResponseCache
+from api.payloadDecoder import PayloadDecoder
+from api.hostLimiter import HostLimiter, Throttled
+from api.httpTransport import BoTransport
+from helpers.metrics import Metrics
+from helpers.checkpointJournal import CheckpointJournal
+from api.sessionManager import BoSessionManager, SessionExpired
+# per‑batch row counts by affiliateName, fed to the adaptive batcher
+_batch_tally: contextvars.ContextVar[Optional[Counter]] = contextvars.ContextVar("_batch_tally", default=None)
+
+
+class StreamClosed(Exception):
+    """The consumer of a page stream went away; producers stop."""
+
+
+class AsyncBoDataAPI:
     """
-    Small helper that fetches *Affiliates* or *SocialMedia* rows from
+    Asyncio engine that fetches *Affiliates* or *SocialMedia* rows from
     the BO endpoint in (keyword‑batch × page) blocks and returns a flat
-    list. Re‑uses the caller's requests.Session so you keep cookies.
+    list. Keyword batches run concurrently; requests to one BO host go
+    through that host's :class:`HostLimiter` (token bucket + AIMD
+    in‑flight limit starting at ``max_in_flight``), shared by every
+    instance that talks to that host. 429 / 5xx / timeouts are retried
+    with jittered exponential backoff. Re‑uses the caller's
+    requests.Session so you keep cookies; when the BO bounces a request
+    to its login page the ``reauth`` callback supplies fresh cookies and
+    the page is retried.
+
+    A batch whose DataTables total exceeds ``max_pages × page_size`` is
+    split instead of truncated: multi‑ID batches are halved, single IDs
+    are re‑queried per ``currencyType`` and then per sub‑day time window
+    (when configured), and the partial results are merged without
+    duplicates. Time windows return each window's totals, so their rows
+    are summed per player before they are handed on; reports without a
+    per‑player identity (the affiliate report) are never split by time.
     """
 
+    # currencyType codes to fan an oversized single‑ID query out over,
+    # e.g. BO_SPLIT_CURRENCY_TYPES="1,2,7"; empty disables this stage
+    SPLIT_CURRENCY_TYPES: Tuple[int, ...] = tuple(
+        int(code) for code in os.getenv("BO_SPLIT_CURRENCY_TYPES", "").split(",") if code.strip()
+    )
+    # "HH:MM:SS-HH:MM:SS" windows for endpoints that accept a time of day,
+    # e.g. BO_SPLIT_TIME_WINDOWS="00:00:00-11:59:59,12:00:00-23:59:59"
+    SPLIT_TIME_WINDOWS: Tuple[Tuple[str, str], ...] = tuple(
+        tuple(window.strip().split("-", 1))
+        for window in os.getenv("BO_SPLIT_TIME_WINDOWS", "").split(",") if "-" in window
+    )
+    # raw columns that identify a row across time windows, and the ones the windows add up to
+    WINDOW_KEYS = ("affiliateName", "affiliateCurrency", "player")
+    WINDOW_SUMS = ("deposit", "withdrawal", "betCount", "turnover", "profit", "bonus")
+
+    RETRY_BASE = float(os.getenv("BO_RETRY_BASE", "1"))   # seconds; backoff ceiling doubles per attempt
+    RETRY_CAP = float(os.getenv("BO_RETRY_CAP", "30"))
+
     def __init__(
         self,
         session,
         cookies: Dict[str, str],
         currency_type: int = -1,
         page_size: int = 100,   # BO's hard limit
-        max_pages: int = 100     # New safety limit
+        max_pages: int = 100,    # New safety limit
+        max_in_flight: int = 4,  # starting in‑flight limit per BO host; AIMD moves it from there
+        reauth: Optional[Callable[[Dict[str, str]], Dict[str, str]]] = None,
+        split_currency_types: Optional[Sequence[int]] = None,
+        split_time_windows: Optional[Sequence[Tuple[str, str]]] = None,
+        batcher: Optional[AdaptiveBatcher] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_scope: str = "",   # brand, so hosts sharing an endpoint path never collide
+        decoder: Optional[PayloadDecoder] = None,
+        metrics: Optional[Metrics] = None,
+        checkpoint: Optional[CheckpointJournal] = None,
     ):
         self.session = session
         self.cookies = cookies
         self.currency_type = currency_type
         self.page_size = page_size
         self.max_pages = max_pages
+        self.max_in_flight = max_in_flight
+        self.reauth = reauth     # stale cookies -> fresh cookies, on session expiry
+        self.split_currency_types = tuple(self.SPLIT_CURRENCY_TYPES if split_currency_types is None else split_currency_types)
+        self.split_time_windows = tuple(self.SPLIT_TIME_WINDOWS if split_time_windows is None else split_time_windows)
+        self.batcher = batcher   # plans batches when fetch() gets batch_size=None
+        self.cache = cache       # closed‑day pages are served from here
+        self.cache_scope = cache_scope
+        self.decoder = decoder or PayloadDecoder()
+        self.metrics = metrics or Metrics.shared()
+        self.checkpoint = checkpoint   # pages + batch plans of this run; written pages are not collected again
+        self.request_count = 0   # HTTP GETs issued by this instance
+        self.failed_pages = 0    # pages given up on after retries
+        self._page_sink: Optional[Callable[[List[Dict[str, Any]], str], None]] = None
+        self._latencies: Dict[str, List[float]] = {}   # endpoint -> seconds per request of the running fetch
+        self._count_lock = threading.Lock()
 
-    def fetch(
+    async def fetch(
         self,
         *,
         endpoint: str,
         data_type: str,
         keywords: List[str],
         target_date: str,
-        batch_size: int = 5,
+        batch_size: Optional[int] = 5,
         max_retries: int = 3,
+        end_date: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Returns a flat list of dict rows for all keywords & pages.
+        Returns a flat list of dict rows for all keywords & pages, in
+        keyword‑batch then page order. ``batch_size=None`` lets the
+        adaptive batcher (if one was given) size each batch; ``end_date``
+        turns the single day into one ``target_date``…``end_date`` window.
         """
-        print(f"\n[START] Fetching {data_type} data | Keywords: {len(keywords)-2} | Date: {target_date}")
+        self.metrics.log(Metrics.INFO, f"[START] Fetching {data_type} data | Keywords: {len(keywords)-2} | Date: {target_date}")
 
-        all_rows = []
         user_ids = keywords[2:]  # skip brand & sheetId
+        # a resumed run must ask for the very same pages, whatever the batcher learned since
+        batches = self.checkpoint.plan(self.cache_scope, endpoint) if self.checkpoint is not None else None
+        if batches is not None:
+            self.metrics.log(Metrics.BATCH, f"  Resuming with the journaled plan: {len(batches)} batches")
+        elif batch_size is None and self.batcher is not None:
+            batches = self.batcher.plan(endpoint, user_ids)
+            self.metrics.log(Metrics.BATCH, f"  Adaptive batching: {len(user_ids)} IDs → {len(batches)} batches")
+        else:
+            size = batch_size or 5
+            batches = [user_ids[start:start + size] for start in range(0, len(user_ids), size)]
+        if self.checkpoint is not None:
+            self.checkpoint.save_plan(self.cache_scope, endpoint, batches)
+        starts = [sum(len(b) for b in batches[:n]) for n in range(len(batches))]
+        limiter = HostLimiter.for_host(endpoint, self.max_in_flight)
+        with self._count_lock:
+            self._latencies[endpoint] = []
 
-        for start in range(0, len(user_ids), batch_size):
-            batch = user_ids[start:start + batch_size]
-            print(f"\nProcessing batch {start+1}-{min(start+batch_size, len(user_ids))}: {batch}")
+        # enough threads for the host's ceiling; the limiter decides how many are on the wire
+        with ThreadPoolExecutor(max_workers=limiter.max_limit) as pool:
+            per_batch = await asyncio.gather(*(
+                self._observed_batch(
+                    pool, limiter,
+                    endpoint=endpoint,
+                    data_type=data_type,
+                    batch=batch,
+                    label=f"{start+1}-{start+len(batch)}",
+                    target_date=target_date,
+                    end_date=end_date,
+                    max_retries=max_retries,
+                )
+                for start, batch in zip(starts, batches)
+            ))
+        if self.batcher is not None:
+            with self._count_lock:
+                latencies = self._latencies.pop(endpoint, [])
+            self.batcher.observe_run(endpoint, latencies)
+            self.batcher.save()
+        self.metrics.gauge("bo_host_in_flight_limit", limiter.stats()["limit"], host=limiter.host)
+        for key, value in BoTransport.stats(self.session).items():
+            self.metrics.gauge(f"bo_http_{key}_total", value, host=limiter.host)
 
-            page = 1
-            last_row_count = -1
-            duplicate_count = 0
-            
-            while page <= self.max_pages:
-                for attempt in range(max_retries):
-                    try:
-                        print(f"  Page {page} (Attempt {attempt+1})...", end=" ", flush=True)
-                        
-                        rows = self._fetch_page(
-                            endpoint=endpoint,
-                            batch=batch,
-                            data_type=data_type,
-                            target_date=target_date,
-                            page=page,
-                        )
-                        
-                        if not rows:
-                            print("✓ (empty)")
-                            break
-                            
-                        # Check for duplicate data (infinite loop protection)
-                        if len(rows) == last_row_count:
-                            duplicate_count += 1
-                            if duplicate_count >= 3:
-                                print("⚠️  Duplicate data detected 3 times, stopping")
-                                break
-                        else:
-                            duplicate_count = 0
-                            last_row_count = len(rows)
-                        
-                        all_rows.extend(rows)
-                        print(f"✓ Added {len(rows)} rows (Total: {len(all_rows)})")
-                        
-                        # Termination conditions
-                        if len(rows) < self.page_size:
-                            print(f"  → End of data (received {len(rows)} < {self.page_size} rows)")
-                            break
-                            
-                        page += 1
-                        break  # Success, exit retry loop
-
-                    except requests.exceptions.Timeout:
-                        print(f"× Timeout")
-                        if attempt == max_retries - 1:
-                            print("  → Max retries reached, skipping")
-                            break
-                        time.sleep(2 ** attempt)
-
-                    except Exception as e:
-                        print(f"× Error: {str(e)}")
-                        break
-
-                else:  # No break occurred, all retries failed
-                    print("  → All attempts failed, moving to next batch")
-                    break
+        all_rows = [row for rows in per_batch for row in rows]
+        if self._page_sink is None:
+            self.metrics.log(Metrics.INFO, f"[COMPLETE] Fetched {len(all_rows)} total rows for {data_type}")
+        else:
+            self.metrics.log(Metrics.INFO, f"[COMPLETE] Streamed all pages for {data_type}")
+        return all_rows
+
+    async def _observed_batch(self, pool, limiter, **kwargs) -> List[Dict[str, Any]]:
+        """``_fetch_batch`` that reports the batch's rows per ID to the batcher."""
+        if self.batcher is None:
+            return await self._fetch_batch(pool, limiter, **kwargs)
+        tally: Counter = Counter()
+        _batch_tally.set(tally)          # child tasks of this batch inherit it
+        rows = await self._fetch_batch(pool, limiter, **kwargs)
+        self.batcher.observe_counts(kwargs["endpoint"], kwargs["batch"], tally)
+        return rows
+
+    def _emit(self, into: List[Dict[str, Any]], rows: List[Dict[str, Any]], unit: str,
+              collect: bool = False) -> None:
+        """
+        Hand one page on: appended to ``into``, or pushed to the stream sink
+        with its unit key. Collected pages the journal has seen written are
+        dropped; streamed ones still go out (the consumer checks the unit, so
+        summaries over the whole result stay complete on resume). ``collect``
+        keeps the page in ``into`` whatever the mode, for the caller to merge.
+        """
+        tally = _batch_tally.get()
+        if tally is not None:
+            tally.update(str(row.get("affiliateName") or "") for row in rows)
+        if collect:
+            into.extend(rows)
+        else:
+            self._hand_on(into, rows, unit)
+
+    def _hand_on(self, into: List[Dict[str, Any]], rows: List[Dict[str, Any]], unit: str) -> None:
+        if self._page_sink is not None:
+            self._page_sink(rows, unit)
+        elif self.checkpoint is None or not self.checkpoint.written(unit):
+            into.extend(rows)
+
+    def _unit(self, *, endpoint: str, batch: List[str], page: int, target_date: str, end_date: Optional[str] = None,
+              currency_type: Optional[int] = None, time_window: Optional[Tuple[str, str]] = None, **_) -> str:
+        """Stable journal key of one page: brand, report, batch, split and page number."""
+        material = [self.cache_scope, Metrics.report_name(endpoint), batch, page, self.page_size,
+                    target_date, end_date, currency_type, time_window]
+        return hashlib.sha1(json.dumps(material).encode()).hexdigest()
+
+    async def _fetch_batch(
+        self,
+        pool: ThreadPoolExecutor,
+        limiter: HostLimiter,
+        *,
+        label: str,
+        max_retries: int,
+        collect: bool = False,
+        **query,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch one keyword batch. Page 1 carries the DataTables total, which
+        plans the remaining pages so they can be requested concurrently;
+        without a total we fall back to paging until a short page.
+        ``collect`` returns the pages even when streaming (see :meth:`_emit`).
+        """
+        self.metrics.log(Metrics.BATCH, f"Processing batch {label}: {query['batch']}")
+
+        first = await self._fetch_with_retry(pool, limiter, label=label, page=1, max_retries=max_retries, **query)
+        if first is None:
+            self.metrics.log(Metrics.WARN, f"  [{label}] → All attempts failed, moving to next batch")
+            self.failed_pages += 1
+            return []
+        rows, total = first
+        if not rows:
+            self.metrics.log(Metrics.PAGE, f"  [{label}] Page 1 ✓ (empty)")
+            return []
+        batch_rows: List[Dict[str, Any]] = []
+        if total is None:
+            return await self._fetch_batch_unplanned(pool, limiter, rows, label=label, max_retries=max_retries,
+                                                     collect=collect, **query)
+
+        total_pages = math.ceil(total / self.page_size)
+        planned = min(total_pages, self.max_pages)
+        self.metrics.log(Metrics.PAGE, f"  [{label}] Page 1 ✓ {len(rows)} rows | total {total} → {planned} page(s)")
+        if total_pages > self.max_pages:
+            sub_queries = self._split_query(query, rows)
+            if sub_queries:
+                return await self._fetch_split(pool, limiter, query, sub_queries, total,
+                                               label=label, max_retries=max_retries, collect=collect)
+            self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️ Warning: Hit max page limit! ({total_pages} pages needed, cannot split further)")
+
+        streaming = self._page_sink is not None and not collect
+
+        async def page_job(page):
+            result = await self._fetch_with_retry(pool, limiter, label=label, page=page, max_retries=max_retries, **query)
+            if result is not None and streaming:
+                self._emit(batch_rows, result[0], self._unit(page=page, **query))     # stream pages as they land
+            return result
+
+        self._emit(batch_rows, rows, self._unit(page=1, **query), collect)
+        received = len(rows)
+        rest = await asyncio.gather(*(page_job(page) for page in range(2, planned + 1)))
+
+        for page, result in enumerate(rest, start=2):
+            if result is None:
+                self.metrics.log(Metrics.WARN, f"  [{label}] × Page {page} failed after retries")
+                self.failed_pages += 1
+                continue
+            received += len(result[0])
+            if not streaming:
+                self._emit(batch_rows, result[0], self._unit(page=page, **query), collect)   # keep page order when collecting
+
+        # completeness is judged against the reported total, not page shapes
+        expected = min(total, planned * self.page_size)
+        if received != expected:
+            self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️ Incomplete batch: {received} of {expected} rows")
+        self.metrics.log(Metrics.BATCH, f"  [{label}] Batch complete. Batch rows: {received}")
+        return batch_rows
+
+    def _split_query(self, query: Dict[str, Any], sample: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Next‑finer set of queries covering ``query``; ``[]`` when none is left.
+        Time windows are only tried when ``sample`` (its first page) has the
+        columns :meth:`_sum_windows` needs.
+        """
+        batch = query["batch"]
+        if len(batch) > 1:
+            mid = len(batch) // 2
+            return [dict(query, batch=batch[:mid]), dict(query, batch=batch[mid:])]
+        if query.get("currency_type") is None and self.currency_type == -1 and self.split_currency_types:
+            return [dict(query, currency_type=code) for code in self.split_currency_types]
+        if query.get("time_window") is None and self.split_time_windows \
+                and sample and all(key in sample[0] for key in self.WINDOW_KEYS):
+            return [dict(query, time_window=window) for window in self.split_time_windows]
+        return []
+
+    async def _fetch_split(
+        self,
+        pool: ThreadPoolExecutor,
+        limiter: HostLimiter,
+        query: Dict[str, Any],
+        sub_queries: List[Dict[str, Any]],
+        total: int,
+        *,
+        label: str,
+        max_retries: int,
+        collect: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the split queries in parallel and merge them, dropping repeats.
+        When streaming, the sub‑queries emit their pages directly instead –
+        except time windows, whose rows are summed per player first and
+        then handed on as one page of ``query``.
+        """
+        self.metrics.log(Metrics.BATCH, f"  [{label}] ✂ {total} rows exceed {self.max_pages}×{self.page_size}, splitting into {len(sub_queries)} queries")
+        windowed = sub_queries[0].get("time_window") is not None
+        parts = await asyncio.gather(*(
+            self._fetch_batch(pool, limiter, label=f"{label}.{n}", max_retries=max_retries,
+                              collect=collect or windowed, **sub)
+            for n, sub in enumerate(sub_queries, start=1)
+        ))
+
+        if windowed:
+            summed = self._sum_windows(parts)
+            if len(summed) < total:
+                self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️ Time windows returned {len(summed)} of {total} rows")
+            self.metrics.log(Metrics.BATCH, f"  [{label}] Split complete. {sum(map(len, parts))} window rows "
+                                            f"→ {len(summed)} rows")
+            if collect:
+                return summed
+            out: List[Dict[str, Any]] = []
+            self._hand_on(out, summed, self._unit(page=0, **query))
+            return out
+
+        if self._page_sink is not None and not collect:
+            self.metrics.log(Metrics.BATCH, f"  [{label}] Split complete (streamed).")
+            return []
+
+        merged: List[Dict[str, Any]] = []
+        seen = set()
+        for part in parts:
+            for row in part:
+                key = json.dumps(row, sort_keys=True, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(row)
+        if len(merged) < total:
+            self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️ Split queries returned {len(merged)} of {total} rows")
+        self.metrics.log(Metrics.BATCH, f"  [{label}] Split complete. Batch rows: {len(merged)}")
+        return merged
+
+    def _sum_windows(self, parts: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """One row per ``WINDOW_KEYS`` identity, ``WINDOW_SUMS`` added up over the windows."""
+        merged: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for part in parts:
+            for row in part:
+                key = tuple(row.get(k) for k in self.WINDOW_KEYS)
+                into = merged.get(key)
+                if into is None:
+                    merged[key] = dict(row)
+                    continue
+                for field in self.WINDOW_SUMS:
+                    into[field] = self._add(into.get(field), row.get(field))
+        return list(merged.values())
 
-                # Check termination conditions again
-                if not rows or len(rows) < self.page_size or duplicate_count >= 3:
+    @staticmethod
+    def _add(a: Any, b: Any) -> Any:
+        """``a + b`` for BO figures: blanks count as 0, ``"1,234.50"`` as a number."""
+        if type(a) is int and type(b) is int:
+            return a + b
+        total = 0.0
+        for value in (a, b):
+            if value is None or value == "":
+                continue
+            try:
+                total += float(str(value).replace(",", ""))
+            except ValueError:
+                return a   # not a figure after all – keep the first window's
+        return total
+
+    async def _fetch_batch_unplanned(
+        self,
+        pool: ThreadPoolExecutor,
+        limiter: HostLimiter,
+        first_rows: List[Dict[str, Any]],
+        *,
+        label: str,
+        max_retries: int,
+        collect: bool = False,
+        **query,
+    ) -> List[Dict[str, Any]]:
+        """Sequential paging for responses that carry no record total."""
+        batch_rows: List[Dict[str, Any]] = []
+        self._emit(batch_rows, first_rows, self._unit(page=1, **query), collect)
+        received = len(first_rows)
+        rows = first_rows
+        last_row_count = len(rows)
+        duplicate_count = 0
+        page = 2
+        self.metrics.log(Metrics.PAGE, f"  [{label}] Page 1 ✓ Added {len(rows)} rows (no total reported)")
+
+        while len(rows) >= self.page_size and page <= self.max_pages:
+            result = await self._fetch_with_retry(pool, limiter, label=label, page=page, max_retries=max_retries, **query)
+            if result is None:
+                self.metrics.log(Metrics.WARN, f"  [{label}] → All attempts failed, moving to next batch")
+                self.failed_pages += 1
+                break
+            rows = result[0]
+            if not rows:
+                self.metrics.log(Metrics.PAGE, f"  [{label}] Page {page} ✓ (empty)")
+                break
+
+            # Check for duplicate data (infinite loop protection)
+            if len(rows) == last_row_count:
+                duplicate_count += 1
+                if duplicate_count >= 3:
+                    self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️  Duplicate data detected 3 times, stopping")
                     break
+            else:
+                duplicate_count = 0
+                last_row_count = len(rows)
 
-            print(f"  Batch complete. Total rows: {len(all_rows)}")
-            if page > self.max_pages:
-                print("  ⚠️ Warning: Hit max page limit!")
+            self._emit(batch_rows, rows, self._unit(page=page, **query), collect)
+            received += len(rows)
+            self.metrics.log(Metrics.PAGE, f"  [{label}] Page {page} ✓ Added {len(rows)} rows (Batch total: {received})")
+            page += 1
 
-        print(f"\n[COMPLETE] Fetched {len(all_rows)} total rows for {data_type}")
-        return all_rows
+        self.metrics.log(Metrics.BATCH, f"  [{label}] Batch complete. Batch rows: {received}")
+        if page > self.max_pages:
+            self.metrics.log(Metrics.WARN, f"  [{label}] ⚠️ Warning: Hit max page limit!")
+        return batch_rows
+
+    async def _fetch_with_retry(
+        self,
+        pool: ThreadPoolExecutor,
+        limiter: HostLimiter,
+        *,
+        label: str,
+        page: int,
+        max_retries: int,
+        **query,
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """One page with the retry rules; ``None`` once every attempt failed."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(max_retries):
+            try:
+                return await loop.run_in_executor(
+                    pool, partial(self._fetch_page, page=page, limiter=limiter, **query)
+                )
+
+            except Throttled as e:
+                self.metrics.retry(brand=self.cache_scope, endpoint=query["endpoint"], reason=e.reason, attempt=attempt + 1)
+                self.metrics.log(Metrics.PAGE, f"  [{label}] Page {page} (Attempt {attempt+1}) × {e}")
+                if attempt == max_retries - 1:
+                    self.metrics.log(Metrics.WARN, f"  [{label}] → Page {page}: BO kept pushing back ({e.reason}), skipping")
+                    return None
+                await asyncio.sleep(HostLimiter.backoff(attempt, self.RETRY_BASE, self.RETRY_CAP, e.retry_after))
+
+            except SessionExpired:
+                self.metrics.retry(brand=self.cache_scope, endpoint=query["endpoint"], reason="session_expired", attempt=attempt + 1)
+                self.metrics.log(Metrics.PAGE, f"  [{label}] Page {page} (Attempt {attempt+1}) × Session expired")
+                if self.reauth is None or attempt == max_retries - 1:
+                    self.metrics.log(Metrics.WARN, f"  [{label}] → Cannot re-authenticate, skipping")
+                    return None
+                self.cookies = await loop.run_in_executor(pool, self.reauth, self.cookies)
+
+            except Exception as e:
+                self.metrics.retry(brand=self.cache_scope, endpoint=query["endpoint"], reason="error", attempt=attempt + 1)
+                self.metrics.log(Metrics.WARN, f"  [{label}] Page {page} (Attempt {attempt+1}) × Error: {str(e)}")
+                return None
+        return None
 
     def _fetch_page(
         self,
@@ -124,16 +490,29 @@ class BoDataAPI:
         data_type: str,
         target_date: str,
         page: int,
-    ) -> List[Dict[str, Any]]:
+        end_date: Optional[str] = None,
+        currency_type: Optional[int] = None,
+        time_window: Optional[Tuple[str, str]] = None,
+        limiter: Optional[HostLimiter] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return ``(aaData rows, DataTables total or None)`` for one page.
+        Raises :class:`Throttled` when the BO pushes back and
+        :class:`SessionExpired` when it bounces to the login page.
+        """
+        last_date = end_date or target_date
+        time_start, time_end = target_date, last_date
+        if time_window:
+            time_start, time_end = f"{target_date} {time_window[0]}", f"{last_date} {time_window[1]}"
         params = {
             "resultBy": "" if data_type == "SocialMedia" else 1,
             "visibleColumns": "",
-            "currencyType": self.currency_type,
+            "currencyType": self.currency_type if currency_type is None else currency_type,
             "searchStatus": -99,
             "userId": ",".join(batch),
             "affiliateInternalType": -1,
-            "searchTimeStart": target_date,
-            "searchTimeEnd": target_date,
+            "searchTimeStart": time_start,
+            "searchTimeEnd": time_end,
             "pageNumber": page,
             "pageSize": self.page_size,
             "sortCondition": 14,
@@ -142,33 +521,166 @@ class BoDataAPI:
             "searchText": "",
         }
 
+        unit = None
+        if self.checkpoint is not None:
+            unit = self._unit(endpoint=endpoint, batch=batch, page=page, target_date=target_date, end_date=end_date,
+                              currency_type=currency_type, time_window=time_window)
+            journaled = self.checkpoint.page(unit)
+            if journaled is not None:
+                self.metrics.request(brand=self.cache_scope, endpoint=endpoint, status="200", seconds=0.0,
+                                     rows=len(journaled[0]), cached=True)
+                return journaled
+
+        cache_key = None
+        if self.cache is not None:
+            if ResponseCache.is_closed(last_date):
+                # projected pages only hold some columns: keep them apart from full ones
+                fields = ",".join(self.decoder.fields or ())
+                cache_key = ResponseCache.key(self.cache_scope, endpoint, dict(params, fields=fields),
+                                              f"{target_date}-{last_date}")
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.metrics.request(brand=self.cache_scope, endpoint=endpoint, status="200", seconds=0.0,
+                                         rows=len(cached["aaData"]), cached=True)
+                    return cached["aaData"], cached["total"]
+            else:
+                self.cache.skip()
+
+        status, size, rows = "error", 0, []
+        started = time.perf_counter()
         try:
-            resp = self.session.get(
-                endpoint, 
-                params=params, 
-                cookies=self.cookies,
-                timeout=30  # Added timeout
-            )
+            with self._count_lock:
+                self.request_count += 1
+            with (limiter or HostLimiter.for_host(endpoint, self.max_in_flight)).slot():
+                sent = time.perf_counter()   # the batcher learns BO latency, not time queued for a slot
+                try:
+                    resp = self.session.get(
+                        endpoint, 
+                        params=params, 
+                        cookies=self.cookies,
+                        timeout=30  # Added timeout
+                    )
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                    status = "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection"
+                    raise Throttled(f"{status}: {e}", reason=status) from e
+                with self._count_lock:
+                    if endpoint in self._latencies:
+                        self._latencies[endpoint].append(time.perf_counter() - sent)
+                status, size = str(resp.status_code), len(resp.content or b"")
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    raise Throttled(f"HTTP {resp.status_code}", reason=status,
+                                    retry_after=self._retry_after(resp))
+            if BoSessionManager.is_expired_response(resp):
+                status = "expired"
+                raise SessionExpired(f"{endpoint} redirected to login")
             resp.raise_for_status()  # Raises HTTPError for bad responses
             
-            payload = resp.json()
+            payload = self.decoder.loads(resp.content)
             if not isinstance(payload.get("aaData", []), list):
                 logging.error("Invalid response format: aaData is not a list")
-                return []
-
-            # Log the raw response size before returning
-            rows = payload["aaData"]
-            # print("------------------------------------------------------------------")
-            # print(f"  → API returned {len(rows)} rows for Page {page}")  # <-- NEW LINE
-            # # print(rows)
-            # print("------------------------------------------------------------------")
-            return rows
-        
-            # return payload["aaData"]
-            
+                return [], None
+
+            rows, total = self.decoder.rows(payload), self._total_records(payload)
+            if cache_key is not None:
+                self.cache.put(cache_key, {"aaData": rows, "total": total})
+            if unit is not None:
+                self.checkpoint.record_page(unit, rows, total)
+            return rows, total
+
         except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                status = "timeout"
             logging.error(f"Request failed: {str(e)}")
-            return []
+            return [], None
         except ValueError as e:
+            status = "bad_json"
             logging.error(f"JSON decode error: {str(e)}")
-            return []
\ No newline at end of file
+            return [], None
+        finally:
+            self.metrics.request(brand=self.cache_scope, endpoint=endpoint, status=status,
+                                 seconds=time.perf_counter() - started, size=size, rows=len(rows))
+
+    @staticmethod
+    def _retry_after(resp) -> Optional[float]:
+        """``Retry-After`` in seconds (the delta‑seconds form only)."""
+        try:
+            return float(resp.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _total_records(payload: Dict[str, Any]) -> Optional[int]:
+        """DataTables total for the current filter, if the BO reported one."""
+        for key in ("iTotalDisplayRecords", "iTotalRecords", "recordsFiltered", "recordsTotal"):
+            value = payload.get(key)
+            if value is None:
+                continue
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                continue
+        return None
+
+
+class BoDataAPI(AsyncBoDataAPI):
+    """
+    Blocking front for :class:`AsyncBoDataAPI` – same constructor, same
+    ``fetch`` signature, runs the async engine to completion.
+    """
+
+    def fetch(self, **kwargs) -> List[Dict[str, Any]]:
+        return asyncio.run(super().fetch(**kwargs))
+
+
+def stream_pages(jobs, max_buffered_pages: int = 8) -> Iterator[Tuple[Any, str, List[Dict[str, Any]]]]:
+    """
+    Run several ``(api, tag, fetch_kwargs)`` crawls at once and yield
+    ``(tag, unit, page_rows)`` as pages arrive (``unit`` is the page's
+    journal key, see :meth:`AsyncBoDataAPI._unit`). At most ``max_buffered_pages``
+    pages wait in memory; when the consumer falls behind, producers block
+    (and stop issuing requests) until it catches up.
+    """
+    pages: "queue.Queue" = queue.Queue(maxsize=max(1, max_buffered_pages))
+    stop = threading.Event()
+    done = object()
+
+    def produce(api, tag, kwargs):
+        def sink(rows, unit):
+            while not stop.is_set():
+                try:
+                    pages.put((tag, unit, rows), timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+            raise StreamClosed()
+
+        api._page_sink = sink
+        try:
+            asyncio.run(AsyncBoDataAPI.fetch(api, **kwargs))
+            item = done
+        except BaseException as e:
+            item = e
+        finally:
+            api._page_sink = None
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    threads = [threading.Thread(target=produce, args=job, daemon=True) for job in jobs]
+    for t in threads:
+        t.start()
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
@@ -0,0 +1,156 @@
+# hostLimiter.py
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+
+class Throttled(Exception):
+    """
+    The BO pushed back: HTTP 429 / 5xx, a timeout or a dropped connection.
+    ``retry_after`` carries the server's ``Retry-After`` seconds, if any.
+    """
+
+    def __init__(self, message: str, reason: str = "throttled", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class HostLimiter:
+    """
+    Admission control for one BO host, shared by every API instance that
+    talks to it.
+
+    * an optional token bucket caps the request rate at ``BO_HOST_RATE``
+      per second (bursts of ``BO_HOST_BURST``) for hosts with a known
+      quota; unset or ``0`` leaves the rate to the AIMD limit;
+    * an AIMD limit caps requests in flight. Each success adds
+      ``1 / limit`` (about +1 per round trip) as long as the smoothed
+      latency stays within ``BO_HOST_LATENCY_TOLERANCE`` × the best recent
+      latency; a 429 / 5xx / timeout halves it, at most once per round
+      trip, and a ``Retry-After`` pauses the host. The limit stays between
+      1 and ``BO_HOST_MAX_IN_FLIGHT``.
+    """
+
+    RATE = float(os.getenv("BO_HOST_RATE", "0"))
+    BURST = float(os.getenv("BO_HOST_BURST", "10"))
+    MAX_IN_FLIGHT = int(os.getenv("BO_HOST_MAX_IN_FLIGHT", "16"))
+    LATENCY_TOLERANCE = float(os.getenv("BO_HOST_LATENCY_TOLERANCE", "1.5"))
+    ALPHA = 0.2           # EWMA weight of the newest latency sample
+    FLOOR_DRIFT = 1.01    # best‑latency floor creeps up 1 % per sample so it can follow a slower host
+
+    _limiters: Dict[str, "HostLimiter"] = {}
+    _limiters_lock = threading.Lock()
+
+    def __init__(self, host: str, initial: int = 4, rate: Optional[float] = None,
+                 burst: Optional[float] = None, max_limit: Optional[int] = None):
+        self.host = host
+        self.max_limit = max(1, self.MAX_IN_FLIGHT if max_limit is None else max_limit)
+        self.limit = float(min(max(1, initial), self.max_limit))
+        self.rate = self.RATE if rate is None else rate
+        self.burst = max(1.0, self.BURST if burst is None else burst)
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._best_latency: Optional[float] = None
+        self._latency: Optional[float] = None
+        self._last_cut = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._bucket_lock = threading.Lock()
+
+    @classmethod
+    def for_host(cls, endpoint: str, initial: int = 4) -> "HostLimiter":
+        """The process‑wide limiter for ``endpoint``'s host."""
+        host = urlsplit(endpoint).netloc
+        with cls._limiters_lock:
+            limiter = cls._limiters.get(host)
+            if limiter is None:
+                limiter = cls._limiters[host] = cls(host, initial=initial)
+            return limiter
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Hold one in‑flight slot (and one token) for the block. A
+        :class:`Throttled` escaping the block counts as congestion; any
+        other exception releases the slot without touching the limit.
+        """
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Throttled as e:
+            self.release(congested=True, retry_after=e.retry_after)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.release(latency=time.monotonic() - started)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+        self._take_token()
+
+    def release(self, latency: Optional[float] = None, congested: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested:
+                # one cut per round trip: a burst of failures is one signal
+                if now - self._last_cut >= (self._latency or 1.0):
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_cut = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            elif latency is not None:
+                self._latency = latency if self._latency is None else \
+                    self.ALPHA * latency + (1 - self.ALPHA) * self._latency
+                self._best_latency = latency if self._best_latency is None else \
+                    min(self._best_latency * self.FLOOR_DRIFT, latency)
+                if self._latency <= self._best_latency * self.LATENCY_TOLERANCE:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "latency": round(self._latency or 0.0, 4),
+                "best_latency": round(self._best_latency or 0.0, 4),
+            }
+
+    @staticmethod
+    def backoff(attempt: int, base: float = 1.0, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+        """Full‑jitter exponential backoff for retry ``attempt`` (0‑based), never shorter than ``retry_after``."""
+        delay = random.uniform(0, min(cap, base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _take_token(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._bucket_lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,183 @@
+# httpTransport.py
+import os
+import threading
+from email.message import Message
+from importlib.util import find_spec
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.request import ACCEPT_ENCODING
+
+from api.hostLimiter import HostLimiter
+
+try:
+    import httpx
+except ImportError:          # optional – only needed for BO_HTTP_CLIENT=httpx
+    httpx = None
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    ``HTTPAdapter`` whose per‑host pools also report how many requests
+    went over how many TCP/TLS connections.
+    """
+
+    def stats(self) -> Dict[str, int]:
+        requests_sent = connections = 0
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        return {"requests": requests_sent, "connections": connections, "http2": 0}
+
+
+class _RawResponse:
+    """The bits of ``urllib3.HTTPResponse`` requests reads after ``_content`` is set."""
+
+    def __init__(self, headers):
+        msg = Message()
+        for key, value in headers.multi_items():
+            msg[key] = value
+        self._original_response = self   # cookie extraction reads ``._original_response.msg``
+        self.msg = msg
+
+    def close(self) -> None:
+        pass
+
+    def release_conn(self) -> None:
+        pass
+
+
+class HttpxAdapter(BaseAdapter):
+    """
+    Sends a requests.Session's prepared requests through one
+    ``httpx.Client``, so cookies, redirects and every caller stay on the
+    requests API while the wire speaks HTTP/2 (when ``h2`` is installed
+    and the host negotiates it over TLS) with multiplexed streams.
+    """
+
+    # hop‑by‑hop headers requests adds that HTTP/2 forbids
+    _HOP_HEADERS = frozenset({"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"})
+
+    def __init__(self, pool_size: int, http2: bool = True):
+        super().__init__()
+        if httpx is None:
+            raise RuntimeError("BO_HTTP_CLIENT=httpx but httpx is not installed")
+        self.http2 = http2 and find_spec("h2") is not None
+        self._client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            follow_redirects=False,     # the Session resolves redirects (and their cookies)
+        )
+        self._counts = {"requests": 0, "connections": 0, "http2": 0}
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in self._HOP_HEADERS]
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        try:
+            r = self._client.request(request.method, request.url, headers=headers, content=body,
+                                     timeout=timeout, extensions={"trace": self._trace})
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request) from e
+
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["http2"] += r.http_version == "HTTP/2"
+
+        resp = requests.Response()
+        resp.status_code = r.status_code
+        resp.reason = r.reason_phrase
+        resp.headers = CaseInsensitiveDict(r.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = r.content          # already decompressed by httpx
+        resp._content_consumed = True
+        resp.raw = _RawResponse(r.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        extract_cookies_to_jar(resp.cookies, request, resp.raw)
+        return resp
+
+    def close(self) -> None:
+        self._client.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self._counts["connections"] += 1
+
+
+class BoTransport:
+    """
+    Builds the ``requests.Session`` every BO host talks through.
+
+    * the connection pool holds ``BO_HTTP_POOL_SIZE`` keep‑alive
+      connections per host (default: the host limiter's in‑flight
+      ceiling), so concurrent pages never wait for, or throw away, a
+      connection;
+    * ``Accept-Encoding`` names every coding the installed decoders
+      handle (gzip, deflate, plus br / zstd with brotli / zstandard);
+      report pages are repetitive JSON and shrink several‑fold;
+    * ``BO_HTTP_CLIENT=httpx`` swaps the wire client for httpx with
+      HTTP/2 (``pip install httpx[http2]``); ``requests`` is the default.
+
+    :meth:`stats` reports requests vs. connections opened, i.e. how well
+    keep‑alive is holding up.
+    """
+
+    CLIENT = os.getenv("BO_HTTP_CLIENT", "requests").lower()   # requests | httpx
+    POOL_SIZE = int(os.getenv("BO_HTTP_POOL_SIZE", "0")) or HostLimiter.MAX_IN_FLIGHT
+
+    @classmethod
+    def session(cls, client: Optional[str] = None, pool_size: Optional[int] = None) -> requests.Session:
+        client = (client or cls.CLIENT).lower()
+        pool_size = pool_size or cls.POOL_SIZE
+        if client == "httpx":
+            adapter = HttpxAdapter(pool_size)
+        elif client == "requests":
+            # one pool per scheme+host; the session only ever talks to its own BO host
+            adapter = PooledHTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        else:
+            raise ValueError(f"Unknown HTTP client: {client}")
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = cls.accept_encoding(client)
+        return session
+
+    @staticmethod
+    def accept_encoding(client: str = "requests") -> str:
+        if client == "requests":
+            return ", ".join(ACCEPT_ENCODING.split(","))      # exactly what urllib3 can decode
+        codings = ["gzip", "deflate"]
+        if find_spec("brotli") is not None or find_spec("brotlicffi") is not None:
+            codings.append("br")
+        if find_spec("zstandard") is not None:
+            codings.append("zstd")
+        return ", ".join(codings)
+
+    @staticmethod
+    def stats(session: requests.Session) -> Dict[str, int]:
+        """``requests`` sent, ``connections`` opened and ``http2`` responses over ``session``'s adapters."""
+        totals = {"requests": 0, "connections": 0, "http2": 0}
+        for adapter in {id(a): a for a in getattr(session, "adapters", {}).values()}.values():
+            if hasattr(adapter, "stats"):
+                for key, value in adapter.stats().items():
+                    totals[key] += value
+        return totals
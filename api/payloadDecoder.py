@@ -0,0 +1,54 @@
+# payloadDecoder.py
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:          # optional – stdlib json is the fallback
+    orjson = None
+
+
+class PayloadDecoder:
+    """
+    Decodes BO DataTables responses straight from the body bytes.
+
+    * ``orjson`` is used when installed (``BO_JSON_BACKEND=auto``, the
+      default); ``stdlib`` forces the standard library decoder. Either way
+      the body bytes are parsed directly, without the intermediate ``str``
+      copy ``requests.Response.json()`` builds through ``Response.text``;
+    * with ``BO_JSON_PROJECT=1`` and ``fields`` set, only those keys of
+      each ``aaData`` row are kept, so the pipeline and the page cache never
+      hold the columns nobody reads. Rebuilding the row dicts costs more
+      CPU than it saves, so this is a memory/cache‑size switch, off by
+      default (see benchmarks/decode_bench.py).
+    """
+
+    BACKEND = os.getenv("BO_JSON_BACKEND", "auto").lower()   # auto | orjson | stdlib
+    PROJECT = os.getenv("BO_JSON_PROJECT", "0") == "1"
+
+    def __init__(self, backend: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                 project: Optional[bool] = None):
+        backend = (backend or self.BACKEND).lower()
+        if backend == "auto":
+            backend = "orjson" if orjson is not None else "stdlib"
+        if backend == "orjson" and orjson is None:
+            raise RuntimeError("BO_JSON_BACKEND=orjson but orjson is not installed")
+        if backend not in ("orjson", "stdlib"):
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        self.backend = backend
+        self._loads = orjson.loads if backend == "orjson" else json.loads
+        project = self.PROJECT if project is None else project
+        self.fields = tuple(fields) if fields and project else None
+
+    def loads(self, body: bytes) -> Any:
+        """Decode one response body; raises ``ValueError`` on malformed JSON."""
+        return self._loads(body)
+
+    def rows(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The payload's ``aaData`` rows, trimmed to ``fields`` when projecting."""
+        rows = payload.get("aaData", [])
+        fields = self.fields
+        if fields is None or not rows or len(rows[0]) <= len(fields):
+            return rows              # nothing to trim: rebuilding the dicts would only cost time
+        return [{key: row[key] for key in fields if key in row} for row in rows]
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from helpers.localFiles import atomic_write
+
+
+class ResponseCache:
+    """
+    Content‑addressed on‑disk cache for BO report pages.
+
+    A page is keyed by brand, endpoint, the request params and the target
+    date, and stored as zlib‑compressed JSON under ``<sha256>.json.z``.
+    Reports for a closed day do not change any more, so only those are
+    served from / written to the cache; the current day always goes to
+    the BO. The directory is kept under ``max_bytes`` by evicting the
+    least recently used files (a hit refreshes the file's mtime).
+
+    The BO does still correct a closed day now and then. With ``refresh``
+    (``BO_CACHE_REFRESH=1``, or ``--refresh`` on main.py / backfill.py)
+    nothing is served from the cache: every page is fetched again and
+    its cached copy replaced, so a rerun picks the corrections up.
+    """
+
+    CACHE_DIR = Path(os.getenv("BO_CACHE_DIR", ".cache/bo_pages"))
+    MAX_BYTES = int(float(os.getenv("BO_CACHE_MAX_MB", "512")) * 1024 * 1024)
+    REFRESH = os.getenv("BO_CACHE_REFRESH", "0") == "1"
+
+    _shared: Optional["ResponseCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 refresh: Optional[bool] = None):
+        self.cache_dir = Path(cache_dir or self.CACHE_DIR)
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        self.refresh = self.REFRESH if refresh is None else refresh
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._size = None   # bytes on disk, computed lazily
+
+    @classmethod
+    def shared(cls) -> "ResponseCache":
+        """Process‑wide instance so hit/miss counters cover the whole run."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    # ────────────────────────────────────────────────────────────
+    # Public API
+    # ────────────────────────────────────────────────────────────
+    @staticmethod
+    def is_closed(target_date: str) -> bool:
+        """True for ``YYYY/MM/DD`` dates strictly before today."""
+        try:
+            day = datetime.strptime(target_date.split(" ")[0], "%Y/%m/%d").date()
+        except ValueError:
+            return False
+        return day < datetime.now().date()
+
+    @staticmethod
+    def key(scope: str, endpoint: str, params: Dict[str, Any], target_date: str) -> str:
+        """
+        Stable digest for one page request. Blank params are dropped so
+        cosmetic changes to the query do not split the cache; pageSize is
+        kept because it moves page boundaries.
+        """
+        material = {
+            "scope": scope,
+            "endpoint": endpoint,
+            "date": target_date,
+            "params": {k: str(v) for k, v in params.items() if v != ""},
+        }
+        blob = json.dumps(material, sort_keys=True).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            payload = json.loads(zlib.decompress(path.read_bytes()))
+            os.utime(path)          # LRU: mark as recently used
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+        path = self._path(key)
+        try:
+            atomic_write(path, blob)
+        except OSError as e:
+            print(f"[cache] could not store page ({e})")
+            return
+        with self._lock:
+            self._size = self._disk_size() if self._size is None else self._size + len(blob)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def skip(self) -> None:
+        """Count a request that bypassed the cache (open day)."""
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.z"
+
+    def _files(self):
+        try:
+            return [p for p in self.cache_dir.iterdir() if p.name.endswith(".json.z")]
+        except OSError:
+            return []
+
+    def _disk_size(self) -> int:
+        total = 0
+        for p in self._files():
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self) -> None:
+        """Drop least recently used pages until we are back under ~90 % of the cap."""
+        entries = []
+        for p in self._files():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        goal = int(self.max_bytes * 0.9)
+        for _, nbytes, p in entries:
+            if size <= goal:
+                break
+            try:
+                p.unlink()
+                size -= nbytes
+            except OSError:
+                pass
+        self._size = size
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+from api.httpTransport import BoTransport
+from helpers.localFiles import atomic_write
+from helpers.metrics import Metrics
+
+
+class SessionExpired(Exception):
+    """Raised when a BO response shows the login session is gone."""
+
+
+class BoSessionManager:
+    """
+    One logged‑in requests.Session per BO host, shared by every
+    controller in the process and built by :class:`BoTransport` (pooled
+    keep‑alive connections, compressed responses). Cookies are persisted
+    to disk so the next run can skip the login round trips while they
+    are younger than the TTL; an expired session is detected from the BO
+    response and the manager signs in again on demand.
+    """
+
+    CACHE_DIR = Path(os.getenv("BO_SESSION_DIR", ".bo_sessions"))
+    TTL_SECONDS = int(os.getenv("BO_SESSION_TTL", "1800"))
+
+    _managers: Dict[str, "BoSessionManager"] = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        login_page_url: str,
+        login_url: str,
+        username: str,
+        password: str,
+        ttl: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+    ):
+        self.host = urlsplit(login_page_url).netloc
+        self.login_page_url = login_page_url
+        self.login_url = login_url
+        self.username = username
+        self.password = password
+        self.ttl = self.TTL_SECONDS if ttl is None else ttl
+        self.cache_path = Path(cache_dir or self.CACHE_DIR) / f"{self.host}.json"
+
+        self.session = BoTransport.session()
+        self.cookies: Dict[str, str] = {}
+        self.logged_in_at = 0.0
+        self.login_count = 0
+        self._lock = threading.Lock()
+
+    # ────────────────────────────────────────────────────────────
+    # Registry
+    # ────────────────────────────────────────────────────────────
+    @classmethod
+    def for_host(cls, *, login_page_url: str, login_url: str, username: str, password: str) -> "BoSessionManager":
+        """Return the process‑wide manager for the host of ``login_page_url``."""
+        host = urlsplit(login_page_url).netloc
+        with cls._managers_lock:
+            mgr = cls._managers.get(host)
+            if mgr is None or mgr.username != username:
+                mgr = cls(login_page_url=login_page_url, login_url=login_url,
+                          username=username, password=password)
+                cls._managers[host] = mgr
+            return mgr
+
+    @classmethod
+    def transport_stats(cls) -> Dict[str, Dict[str, int]]:
+        """``{host: BoTransport.stats(...)}`` for every host signed into so far."""
+        with cls._managers_lock:
+            managers = list(cls._managers.values())
+        return {mgr.host: BoTransport.stats(mgr.session) for mgr in managers}
+
+    # ────────────────────────────────────────────────────────────
+    # Public API
+    # ────────────────────────────────────────────────────────────
+    def ensure(self) -> Dict[str, str]:
+        """Return live cookies, loading them from disk or logging in if needed."""
+        with self._lock:
+            if self.cookies and not self._expired():
+                return self.cookies
+            if self._load():
+                Metrics.shared().log(Metrics.BATCH, f"[session] {self.host}: reusing cached cookies")
+                return self.cookies
+            return self._login()
+
+    def refresh(self, stale: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Force a new login after the BO rejected ``stale`` cookies. If another
+        thread already refreshed them in the meantime, its cookies are returned.
+        """
+        with self._lock:
+            if stale is not None and self.cookies and self.cookies != stale and not self._expired():
+                return self.cookies
+            Metrics.shared().log(Metrics.WARN, f"[session] {self.host}: session expired, signing in again")
+            return self._login()
+
+    @staticmethod
+    def is_expired_response(resp) -> bool:
+        """True when a report request was bounced to the login page."""
+        if resp.status_code in (401, 403):
+            return True
+        if "login.jsp" in (resp.url or "") or any("login.jsp" in (h.headers.get("Location") or "") for h in resp.history):
+            return True
+        content_type = resp.headers.get("Content-Type", "")
+        if "html" in content_type:
+            return True
+        return resp.content[:1].strip() == b"<"
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _expired(self) -> bool:
+        return time.time() - self.logged_in_at >= self.ttl
+
+    def _login(self) -> Dict[str, str]:
+        # -------- 1) GET login page --------
+        self.session.cookies.clear()  # <- force fresh login
+        resp = self.session.get(self.login_page_url, timeout=10)
+        resp.raise_for_status()            # throws for 4xx / 5xx
+
+        # -------- 2) Scrape randomCode --------
+        soup = BeautifulSoup(resp.text, "html.parser")
+        random_tag = soup.find("input", {"id": "randomCode"})
+        if random_tag is None:
+            raise RuntimeError("randomCode input not found on login page.")
+
+        # -------- 3) POST credentials --------
+        auth_payload = {
+            "username": self.username,
+            "password": hashlib.sha1(self.password.encode()).hexdigest(),
+            "randomCode": random_tag["value"],
+        }
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "Accept": "*/*",
+        }
+        login = self.session.post(self.login_url, data=auth_payload, headers=headers, timeout=10)
+        login.raise_for_status()
+
+        # -------- 4) Success --------
+        self.cookies = self.session.cookies.get_dict()
+        self.logged_in_at = time.time()
+        self.login_count += 1
+        self._save()
+        Metrics.shared().log(Metrics.BATCH, f"[session] {self.host}: authentication successful.")
+        return self.cookies
+
+    def _load(self) -> bool:
+        try:
+            cached = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return False
+        if cached.get("username") != self.username or not cached.get("cookies"):
+            return False
+        if time.time() - cached.get("saved_at", 0) >= self.ttl:
+            return False
+        self.cookies = cached["cookies"]
+        self.logged_in_at = cached["saved_at"]
+        self.session.cookies.clear()
+        self.session.cookies.update(self.cookies)
+        return True
+
+    def _save(self) -> None:
+        try:
+            atomic_write(self.cache_path, json.dumps({
+                "host": self.host,
+                "username": self.username,
+                "saved_at": self.logged_in_at,
+                "cookies": self.cookies,
+            }), mode=0o600)
+        except OSError as e:
+            Metrics.shared().log(Metrics.WARN, f"[session] {self.host}: could not persist cookies ({e})")
@@ -0,0 +1,139 @@
+"""
+backfill.py — re-run SocialMedia / Affiliates for a range of past dates
+
+    python backfill.py 2025-07-01 2025-07-07                 # both passes, one day at a time
+    python backfill.py 2025-07-01 2025-07-07 --type Affiliates --workers 8
+    python backfill.py 2025-07-01 2025-07-07 --window        # one BO query for the whole range
+    python backfill.py 2025-01-01 2025-06-30 --history-only  # bulk-load the history store, no sheet writes
+    python backfill.py 2025-07-01 2025-07-07 --refresh       # bypass the page cache, pick up BO corrections
+
+(brand, date) units are fetched on a bounded worker pool, at most two per
+worker ahead of the writer; every unit of a host shares that host's
+logged-in session. Rows are buffered in date order and a destination tab
+goes out every STREAM_CHUNK_ROWS rows, so neither memory nor a single
+append grows with the length of the range. Day units also land in the
+local history store (windows do not).
+"""
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from main import (
+    USERNAME, PASSWORD, SOCIAL_SHEET_ID, AFFILIATE_SHEET_ID, STREAM_CHUNK_ROWS,
+    SOCIAL_RANGES, AFFILIATE_RANGES,
+    build_social_row, build_affiliate_row, build_affiliate_row_socmed,
+    console, fetch_dual, write_brand_rows, flush_writer,
+)
+from api.responseCache import ResponseCache
+from controllers.AcquisitionController import AcquisitionController
+from controllers.SpreadSheetController import SpreadsheetController
+from helpers.spreadsheet_controller import BufferedSheetWriter
+from helpers.historyStore import HistoryStore
+from helpers.rowLedger import RowLedger
+
+# type -> (keyword sheet, keyword ranges, row builder, socmed row builder, fixed tab)
+PASSES = {
+    "SocialMedia": (SOCIAL_SHEET_ID, SOCIAL_RANGES, build_social_row, build_affiliate_row_socmed, "*Daily_Data (Player)"),
+    "Affiliates": (AFFILIATE_SHEET_ID, AFFILIATE_RANGES, build_affiliate_row, build_affiliate_row_socmed, None),
+}
+
+
+def date_units(start, end, window=False):
+    """
+    Return ``(bo_start, bo_end, sheet_label)`` per unit: one per day, or a
+    single unit spanning ``start``…``end`` when ``window`` is set.
+    """
+    if window:
+        return [(start.strftime("%Y/%m/%d"), end.strftime("%Y/%m/%d"),
+                 f"{start:%d/%m/%Y} - {end:%d/%m/%Y}")]
+    units, day = [], start
+    while day <= end:
+        units.append((day.strftime("%Y/%m/%d"), None, day.strftime("%d/%m/%Y")))
+        day += timedelta(days=1)
+    return units
+
+
+def fetch_unit(type, brand, kw, bo_start, bo_end, history=None):
+    ac = AcquisitionController(
+        email=USERNAME, password=PASSWORD,
+        currency="all", currency_type=-1,
+        brand=brand, targetdate=bo_start, history=history,
+    )
+    return fetch_dual(type, ac, kw, bo_start, end_date=bo_end)
+
+
+def backfill(start, end, types=("SocialMedia", "Affiliates"), workers=4, window=False, history_only=False):
+    units = date_units(start, end, window)
+    history = HistoryStore.open()
+    if history_only and (history is None or window):
+        raise SystemExit("--history-only needs the history store (BO_HISTORY_DB) and day units (no --window)")
+
+    for type in types:
+        sheet_id, ranges, row_builder, row_builder_socmed, fixed_tab = PASSES[type]
+        keywords = SpreadsheetController(sheet_id).get_keywords_batch(ranges)
+        brands = [brand for brand, kw in keywords.items() if kw]
+        for brand in ranges:
+            if brand not in brands:
+                console.log(f"[yellow]{brand}: no keywords")
+
+        # rows in date order, a chunk per tab at a time; dates already in the sheets only send their changes
+        writer = BufferedSheetWriter(type=type, chunk_rows=STREAM_CHUNK_ROWS, ledger=RowLedger.open())
+        pending = iter([(brand, bo_start, bo_end, label) for bo_start, bo_end, label in units for brand in brands])
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            def submit(brand, bo_start, bo_end, label):
+                return brand, label, pool.submit(fetch_unit, type, brand, keywords[brand], bo_start, bo_end, history)
+
+            # sliding window: a unit is only fetched once it is near the head of the date order,
+            # and its result is dropped as soon as it has been written
+            in_flight = deque(submit(*unit) for _, unit in zip(range(2 * max(1, workers)), pending))
+            while in_flight:
+                brand, label, job = in_flight.popleft()
+                unit = next(pending, None)
+                if unit is not None:
+                    in_flight.append(submit(*unit))
+                kw = keywords[brand]
+                dest_sheet = kw[1] if len(kw) > 1 else sheet_id
+                tab_name = fixed_tab or brand
+                try:
+                    out = job.result()
+                    if history_only:
+                        console.log(f"[green]{type} {label} {brand}: {len(out['data'])} rows stored "
+                                    f"({out['requests']} BO requests)")
+                        continue
+                    rows = write_brand_rows(brand, type, dest_sheet, tab_name, out,
+                                            row_builder, row_builder_socmed, label, writer=writer)
+                    console.log(f"[green]{type} {label} {brand}: {len(rows)} rows queued → {tab_name} ({out['requests']} BO requests)")
+                except Exception as e:
+                    console.log(f"[red]{type} {label} {brand} ERROR: {e}")
+                finally:
+                    job = out = rows = None
+        if not history_only:
+            flush_writer(writer)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backfill BO data into the Sheets for a date range.")
+    parser.add_argument("start", help="first date, YYYY-MM-DD")
+    parser.add_argument("end", help="last date (inclusive), YYYY-MM-DD")
+    parser.add_argument("--type", choices=["SocialMedia", "Affiliates", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=4, help="(brand, date) units fetched in parallel")
+    parser.add_argument("--window", action="store_true",
+                        help="query the whole range as one searchTimeStart/searchTimeEnd window")
+    parser.add_argument("--history-only", action="store_true",
+                        help="only load the local history store; nothing is written to the sheets")
+    parser.add_argument("--refresh", action="store_true",
+                        help="fetch every day from the BO even when the page cache has it (BO_CACHE_REFRESH=1)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date()
+    if end < start:
+        raise SystemExit("end date is before start date")
+    types = ("SocialMedia", "Affiliates") if args.type == "both" else (args.type,)
+    if args.refresh:
+        ResponseCache.shared().refresh = True
+    backfill(start, end, types, workers=args.workers, window=args.window, history_only=args.history_only)
@@ -0,0 +1,293 @@
+# boStub.py
+import gzip
+import json
+import secrets
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+LOGIN_PAGE = "/page/manager/login.jsp"
+LOGIN_POST = "/login/manager/managerController/login"
+PLAYER_REPORT = "/manager/AffiliateController/searchPerformancePlayerReport"
+AFFILIATE_REPORT = "/manager/AffiliateController/searchPerformanceAffiliateReport"
+
+
+class BoDataset:
+    """
+    Report rows served by :class:`BoStubServer`, keyed by affiliate.
+
+    Built from ``bo_response.json``‑style records (friendly column names);
+    ``scale`` clones every affiliate ``scale`` times (``name``, ``name_x1`` …)
+    so keyword lists, pages and rows all grow together.
+
+    Each player's day is spread evenly over ``ACTIVE_HOURS`` hours starting
+    at a fixed hour of their own, so a player report asked for a time of
+    day (:meth:`window_rows`) lists only the players active then, with
+    their share of the day's figures; adjacent windows add up to the day.
+    """
+
+    FIGURES = ("deposit", "withdrawal", "betCount", "turnover", "profit", "bonus")
+    ACTIVE_HOURS = 4
+
+    def __init__(self, records: List[Dict[str, Any]], scale: int = 1):
+        by_affiliate: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for rec in records:
+            by_affiliate[rec["affiliate_username"]].append(rec)
+
+        self.players: Dict[str, List[Dict[str, Any]]] = {}
+        self.affiliates: Dict[str, Dict[str, Any]] = {}
+        for base, recs in by_affiliate.items():
+            for copy in range(max(1, scale)):
+                name = base if copy == 0 else f"{base}_x{copy}"
+                self.players[name] = [self._player_row(name, i, rec) for i, rec in enumerate(recs)]
+                self.affiliates[name] = self._affiliate_row(name, recs)
+
+    @classmethod
+    def from_file(cls, path: str, scale: int = 1) -> "BoDataset":
+        with open(path, encoding="utf-8") as fh:
+            return cls(json.load(fh)["data"], scale)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.players)
+
+    @property
+    def row_count(self) -> int:
+        return sum(len(rows) for rows in self.players.values())
+
+    def rows(self, path: str, ids: List[str]) -> List[Dict[str, Any]]:
+        if path == PLAYER_REPORT:
+            return [row for name in ids for row in self.players.get(name, ())]
+        return [self.affiliates[name] for name in ids if name in self.affiliates]
+
+    def window_rows(self, rows: List[Dict[str, Any]], start: int, end: int) -> List[Dict[str, Any]]:
+        """Player rows as the BO reports them for seconds ``start``…``end`` of the day."""
+        out = []
+        for row in rows:
+            first = self._first_hour(row["player"]) * 3600
+            last = first + self.ACTIVE_HOURS * 3600
+            if end <= first or start >= last:
+                continue
+            share = dict(row)
+            for key in self.FIGURES:
+                value = row.get(key)
+                if isinstance(value, (int, float)):
+                    share[key] = self._upto(value, end, first, last) - self._upto(value, start, first, last)
+                    if isinstance(value, float):
+                        share[key] = round(share[key], 2)
+            out.append(share)
+        return out
+
+    @staticmethod
+    def _first_hour(player: str) -> int:
+        return int(player.rsplit("_p", 1)[1]) * 7 % 20
+
+    @staticmethod
+    def _upto(value, second: int, first: int, last: int):
+        """How much of ``value`` a player active from ``first`` to ``last`` has reached by ``second``."""
+        part = value * min(max(second - first, 0), last - first) / (last - first)
+        return round(part) if isinstance(value, int) else round(part, 2)
+
+    @staticmethod
+    def _player_row(name: str, i: int, rec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "affiliateName": name,
+            "affiliateCurrency": rec.get("currency"),
+            "player": f"{name}_p{i}",
+            "deposit": rec.get("total_deposit"),
+            "withdrawal": rec.get("total_withdrawal"),
+            "betCount": rec.get("total_number_of_bets"),
+            "turnover": rec.get("total_turnover"),
+            "profit": rec.get("total_profit_and_loss"),
+            "bonus": rec.get("total_bonus"),
+        }
+
+    @staticmethod
+    def _affiliate_row(name: str, recs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        def total(key):
+            return round(sum(rec.get(key) or 0 for rec in recs), 2)
+        depositors = sum(1 for rec in recs if rec.get("total_deposit"))
+        return {
+            "affiliateName": name,
+            "affiliateCurrency": recs[0].get("currency"),
+            "registerCount": len(recs),
+            "firstDepositCount": depositors,
+            "firstDeposit": total("total_deposit"),
+            "activePlayer": sum(1 for rec in recs if rec.get("total_number_of_bets")),
+            "deposit": total("total_deposit"),
+            "withdrawal": total("total_withdrawal"),
+            "turnover": total("total_turnover"),
+            "profit": total("total_profit_and_loss"),
+            "bonus": total("total_bonus"),
+        }
+
+
+class BoStubServer:
+    """
+    Local stand‑in for one BO host: ``login.jsp`` with a ``randomCode``
+    input, the login POST, and the two paginated DataTables reports.
+
+    Every report request sleeps ``latency`` seconds; ``max_page_size``
+    caps whatever ``pageSize`` the client asks for. Requests without the
+    session cookie are redirected to ``login.jsp``, like the real BO.
+    With ``capacity`` set, a report request arriving while that many are
+    already being served gets a 429 (``Retry-After: 1``). Report bodies are
+    gzipped for clients that accept it unless ``compress`` is off;
+    ``bytes`` counts what went over the wire. Player report requests for a
+    time of day (``searchTimeStart=yyyy/mm/dd HH:MM:SS``) get that window's
+    rows and are counted in ``windowed``.
+    """
+
+    def __init__(self, dataset: BoDataset, latency: float = 0.0, max_page_size: int = 100,
+                 capacity: Optional[int] = None, compress: bool = True, host: str = "127.0.0.1", port: int = 0):
+        self.dataset = dataset
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.capacity = capacity
+        self.compress = compress
+        self.in_flight = 0
+        self.throttled = 0
+        self.sessions: set = set()
+        self.requests = 0
+        self.logins = 0
+        self.bytes_sent = 0
+        self.windowed = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def links(self) -> Dict[str, List[str]]:
+        """``{"SocialMedia": [...], "Affiliates": [...]}`` in AcquisitionController's URL layout."""
+        base = self.base_url
+        return {
+            "SocialMedia": [base + LOGIN_PAGE, base + LOGIN_POST, base + PLAYER_REPORT, base + AFFILIATE_REPORT],
+            "Affiliates": [base + LOGIN_PAGE, base + LOGIN_POST, base + AFFILIATE_REPORT],
+        }
+
+    def start(self) -> "BoStubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="bo-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "logins": self.logins, "bytes": self.bytes_sent,
+                    "throttled": self.throttled}
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _page(self, path: str, query: Dict[str, str]) -> Dict[str, Any]:
+        ids = [i for i in query.get("userId", "").split(",") if i]
+        rows = self.dataset.rows(path, ids)
+        window = self._window(query)
+        if window is not None and path == PLAYER_REPORT:
+            rows = self.dataset.window_rows(rows, *window)
+            with self._lock:
+                self.windowed += 1
+        size = max(1, min(int(query.get("pageSize") or self.max_page_size), self.max_page_size))
+        page = max(1, int(query.get("pageNumber") or 1))
+        return {
+            "aaData": rows[(page - 1) * size: page * size],
+            "iTotalDisplayRecords": len(rows),
+            "iTotalRecords": len(rows),
+        }
+
+    @staticmethod
+    def _window(query: Dict[str, str]) -> Optional[Tuple[int, int]]:
+        """``(first second, second after the last)`` of a time‑of‑day query, else ``None``."""
+        def second(value: str) -> Optional[int]:
+            if " " not in value:
+                return None
+            h, m, s = (int(part) for part in value.split(" ", 1)[1].split(":"))
+            return h * 3600 + m * 60 + s
+        start, end = second(query.get("searchTimeStart", "")), second(query.get("searchTimeEnd", ""))
+        if start is None or end is None:
+            return None
+        return start, end + 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == LOGIN_PAGE:
+                    code = secrets.token_hex(4)
+                    return self._send(200, f'<html><input type="hidden" id="randomCode" value="{code}"></html>'.encode(),
+                                      "text/html;charset=UTF-8")
+                if url.path not in (PLAYER_REPORT, AFFILIATE_REPORT):
+                    return self._send(404, b"not found", "text/plain")
+                with stub._lock:
+                    stub.requests += 1
+                if self._cookie() not in stub.sessions:
+                    return self._send(302, b"", "text/html", {"Location": LOGIN_PAGE})
+                with stub._lock:
+                    busy = stub.capacity is not None and stub.in_flight >= stub.capacity
+                    if busy:
+                        stub.throttled += 1
+                    else:
+                        stub.in_flight += 1
+                if busy:
+                    return self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": "1"})
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    query = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+                    body = json.dumps(stub._page(url.path, query), separators=(",", ":")).encode()
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                if stub.compress and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    return self._send(200, gzip.compress(body, compresslevel=5), "application/json;charset=UTF-8",
+                                      {"Content-Encoding": "gzip"})
+                self._send(200, body, "application/json;charset=UTF-8")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode())
+                if urlsplit(self.path).path != LOGIN_POST or not form.get("randomCode"):
+                    return self._send(400, b"bad login", "text/plain")
+                token = secrets.token_hex(16)
+                with stub._lock:
+                    stub.sessions.add(token)
+                    stub.logins += 1
+                self._send(200, b'{"success":true}', "application/json", {"Set-Cookie": f"JSESSIONID={token}; Path=/"})
+
+            def _cookie(self) -> str:
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    key, _, value = part.strip().partition("=")
+                    if key == "JSESSIONID":
+                        return value
+                return ""
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.bytes_sent += len(body)
+
+        return Handler
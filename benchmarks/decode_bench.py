@@ -0,0 +1,84 @@
+"""
+decode_bench.py — BO page decode throughput, rows per second
+
+    python benchmarks/decode_bench.py                     # bo_response.json, 50 rounds
+    python benchmarks/decode_bench.py --rounds 200 --scale 4 --extra-columns 20
+
+bo_response.json holds rows already renamed to friendly columns, so a raw
+DataTables page is rebuilt from it: every row gets the raw keys of all
+the helpers' field maps, plus ``--extra-columns`` synthetic filler
+columns standing in for the report columns no helper reads. The page is
+then decoded with ``requests.Response.json()`` (what _fetch_page used to
+do) and with PayloadDecoder on each available backend, with and without
+projection down to ByAffiliate's columns.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.payloadDecoder import PayloadDecoder, orjson
+from helpers.byPlayer import ByPlayer
+from helpers.byAffiliate import ByAffiliate
+from helpers.byAffiliateSocialMedia import ByAffiliateSocialMedia
+
+
+def raw_page(records, extra_columns=0):
+    """A DataTables body carrying ``records`` under their raw BO keys."""
+    field_map = {}
+    for helper in (ByPlayer, ByAffiliate, ByAffiliateSocialMedia):
+        field_map.update(helper.DEFAULT_FIELD_MAP)
+    rows = [{raw: rec.get(pretty) for raw, pretty in field_map.items()} for rec in records]
+    for row in rows:
+        row.update((f"column{i}", i) for i in range(extra_columns))
+    payload = {"aaData": rows, "iTotalDisplayRecords": len(rows), "iTotalRecords": len(rows)}
+    return json.dumps(payload).encode()
+
+
+def response_for(body):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers["Content-Type"] = "application/json;charset=UTF-8"
+    resp._content = body
+    return resp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BO payload decoding.")
+    parser.add_argument("--input", default="bo_response.json")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--scale", type=int, default=1, help="repeat the sample rows this many times per page")
+    parser.add_argument("--extra-columns", type=int, default=0, help="unread filler columns added to every row")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as fh:
+        records = json.load(fh)["data"] * max(1, args.scale)
+    body = raw_page(records, args.extra_columns)
+    resp = response_for(body)
+    fields = tuple(ByAffiliate.DEFAULT_FIELD_MAP)
+
+    cases = [("requests resp.json()", lambda: resp.json()["aaData"])]
+    for backend in ("stdlib", "orjson"):
+        if backend == "orjson" and orjson is None:
+            print("orjson not installed – skipping the orjson backend")
+            continue
+        full = PayloadDecoder(backend=backend, project=False)
+        projected = PayloadDecoder(backend=backend, fields=fields, project=True)
+        cases.append((f"{backend}", lambda d=full: d.rows(d.loads(body))))
+        cases.append((f"{backend} + projection", lambda d=projected: d.rows(d.loads(body))))
+
+    print(f"{len(records)} rows/page, {len(body) / 1024:.0f} KiB/page × {args.rounds} rounds")
+    for name, decode in cases:
+        assert len(decode()) == len(records), name
+        best = min(timeit.repeat(decode, number=args.rounds, repeat=3))
+        print(f"{name:<26} {len(records) * args.rounds / best:12,.0f} rows/s"
+              f"   {len(body) * args.rounds / best / 2**20:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+e2e_bench.py — main.process_sheet end to end against local stubs
+
+    python benchmarks/e2e_bench.py                            # bo_response.json at 1×, 10×, 100×
+    python benchmarks/e2e_bench.py --scales 1,10 --latency 0.05 --workers 8
+    python benchmarks/e2e_bench.py --scales 10 --capacity 6     # stub hosts answer 429 past 6 in flight
+    BO_HTTP_CLIENT=httpx python benchmarks/e2e_bench.py --no-gzip  # other wire client, uncompressed bodies
+    python benchmarks/e2e_bench.py --json results.json        # keep numbers for regression tracking
+
+Every brand gets its own stub BO host (benchmarks/boStub.py) serving the
+fixture rows, scaled by cloning affiliates; the Sheets API is replaced by
+the in‑memory SheetsSink (benchmarks/sheetsSink.py). Both main passes run
+unchanged, as stages, and each stage reports BO requests, logins,
+connections opened, wire MiB, rows written, wall time, rows/s and peak
+RSS (which includes the sink's own copy of every written row). Before
+the stages, every scale checks that one ``main.fetch_dual`` issues exactly
+the BO requests of crawling its two reports once each, and that a player
+report split into ``BO_SPLIT_TIME_WINDOWS`` adds up to the unsplit one. Sessions,
+page cache, batch stats, checkpoint journal, history store, row ledger,
+keyword cache and sheet format cache all live in a throwaway directory,
+so every run starts cold.
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# ────────── isolate every cache before the project modules read their env ──────────
+WORKDIR = tempfile.mkdtemp(prefix="bo-bench-")
+atexit.register(shutil.rmtree, WORKDIR, ignore_errors=True)
+for key, value in {
+    "BO_USERNAME": "bench", "BO_PASSWORD": "bench",
+    "SOCIALMEDIA_SHEET": "bench-social", "AFFILIATE_SHEET": "bench-affiliate",
+    "PRIVATE_KEY": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+os.environ["BO_SESSION_DIR"] = os.path.join(WORKDIR, "sessions")
+os.environ["BO_CACHE_DIR"] = os.path.join(WORKDIR, "bo_pages")
+os.environ["BO_BATCH_STATS"] = os.path.join(WORKDIR, "batch_stats.json")
+os.environ["BO_CHECKPOINT_DB"] = os.path.join(WORKDIR, "checkpoints.sqlite")
+os.environ["BO_HISTORY_DB"] = os.path.join(WORKDIR, "history.sqlite")
+os.environ["BO_LEDGER_DB"] = os.path.join(WORKDIR, "row_ledger.sqlite")
+os.environ["KEYWORD_CACHE"] = os.path.join(WORKDIR, "keywords.json")
+os.environ["SHEET_FORMAT_CACHE"] = os.path.join(WORKDIR, "sheet_formats.json")
+# only a single ID past max_pages is split by time; the stages never get there
+os.environ["BO_SPLIT_TIME_WINDOWS"] = "00:00:00-11:59:59,12:00:00-23:59:59"
+
+import main
+from api.sessionManager import BoSessionManager
+from controllers.AcquisitionController import AcquisitionController
+from helpers.keywordCache import KeywordCache
+from helpers.sheetSchema import SheetSchema
+from helpers.sheetsClient import SheetsClientFactory
+
+from boStub import BoDataset, BoStubServer
+from sheetsSink import SheetsSink
+
+
+class RssSampler:
+    """Peak resident set size while the ``with`` block runs (Linux /proc, else ru_maxrss)."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+# the two passes of main.main(), one stage each
+STAGES = [
+    ("SocialMedia", lambda workers: main.process_sheet(
+        main.SOCIAL_SHEET_ID, main.SOCIAL_RANGES, "SocialMedia", fixed_tab="*Daily_Data (Player)", workers=workers)),
+    ("Affiliates", lambda workers: main.process_sheet(
+        main.AFFILIATE_SHEET_ID, main.AFFILIATE_RANGES, type="Affiliates", workers=workers)),
+]
+
+
+def check_fetch_dual(dataset, latency, page_size, verbose, batch_size=5):
+    """
+    One SocialMedia ``fetch_dual`` against a fresh stub host must cost the
+    BO requests of one player‑report crawl plus one affiliate‑report crawl,
+    i.e. ``data_socmed`` comes out of the same crawl. Runs on today's date
+    (never page‑cached) with fixed batches, so the crawls are comparable.
+    """
+    server = BoStubServer(dataset, latency=latency, max_page_size=page_size).start()
+    links = server.links()["SocialMedia"]
+    AcquisitionController._socmedlinks = {"BAJI": links}
+    keywords = ["BAJI", main.SOCIAL_SHEET_ID] + dataset.names
+    today = datetime.now().strftime("%Y/%m/%d")
+
+    def controller():
+        return AcquisitionController(email="bench", password="bench", currency="all", currency_type=-1,
+                                     brand="BAJI", targetdate=today)
+
+    def requests_of(crawl):
+        before = server.counters()["requests"]
+        crawl()
+        return server.counters()["requests"] - before
+
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with out:
+            dual = controller()
+            dual_requests = requests_of(lambda: main.fetch_dual("SocialMedia", dual, keywords, today, batch_size))
+            single = controller()
+            single._authenticate("SocialMedia")
+            single_requests = [
+                requests_of(lambda: single._new_api(page_size, data_type).fetch(
+                    endpoint=endpoint, data_type=data_type, keywords=keywords, target_date=today,
+                    batch_size=batch_size))
+                for endpoint, data_type in ((links[2], "SocialMedia"), (links[3], "Affiliates"))
+            ]
+    finally:
+        server.stop()
+        # what the batcher learned here must not warm up the stages
+        AcquisitionController._shared_batcher = None
+        with contextlib.suppress(OSError):
+            os.remove(os.environ["BO_BATCH_STATS"])
+    expected = sum(single_requests)
+    if dual_requests != expected or dual.requests_made != dual_requests:
+        raise SystemExit(f"fetch_dual issued {dual_requests} BO requests ({dual.requests_made} counted), "
+                         f"crawling each report once takes {expected}")
+    print(f"fetch_dual: {dual_requests} BO requests = {single_requests[0]} player + {single_requests[1]} affiliate ✓")
+
+
+def check_time_windows(dataset, latency, verbose, page_size=10, max_pages=5, batch_size=5):
+    """
+    With ``BO_SPLIT_TIME_WINDOWS`` on, affiliates with more than
+    ``max_pages × page_size`` players are fetched per time window and
+    summed back per player. Streamed (as ``process_sheet`` reads it) and
+    collected (as ``fetch_dual`` does), every player must come out once,
+    with the figures of the unsplit crawl.
+    """
+    server = BoStubServer(dataset, latency=latency).start()
+    AcquisitionController._socmedlinks = {"BAJI": server.links()["SocialMedia"]}
+    keywords = ["BAJI", main.SOCIAL_SHEET_ID] + dataset.names
+    today = datetime.now().strftime("%Y/%m/%d")
+    sheet_date = datetime.now().strftime("%d/%m/%Y")
+
+    def crawl(pages, stream):
+        ac = AcquisitionController(email="bench", password="bench", currency="all", currency_type=-1,
+                                   brand="BAJI", targetdate=today)
+        new_api = ac._new_api
+
+        def capped_api(*args, **kwargs):
+            api = new_api(*args, **kwargs)
+            api.max_pages = pages
+            return api
+
+        ac._new_api = capped_api
+        if stream:
+            rows = [row for kind, _, page in ac.stream_bo_batched("SocialMedia", keywords, today, batch_size, page_size,
+                                                                  sheet_date=sheet_date)
+                    if kind == "data" for row in page]
+        else:
+            out = ac.fetch_bo_batched("SocialMedia", keywords, today, batch_size, page_size)
+            rows = [main.build_social_row(rec, sheet_date) for rec in out["data"]]
+        if ac.failed_pages:
+            raise SystemExit(f"time windows: {ac.failed_pages} page(s) failed")
+        return rows
+
+    def per_player(rows, how):
+        totals = {}
+        for row in rows:
+            key = tuple(row[i] for i in main.PLAYER_IDENTITY)
+            if key in totals:
+                raise SystemExit(f"time windows ({how}): {key} came out twice")
+            totals[key] = [float(value or 0) for value in row[5:]]
+        return totals
+
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with out:
+            plain = per_player(crawl(100, stream=True), "unsplit")
+            windowed_before = server.windowed
+            split = {how: per_player(crawl(max_pages, stream=how == "streamed"), how)
+                     for how in ("streamed", "collected")}
+            windowed = server.windowed - windowed_before
+    finally:
+        server.stop()
+        AcquisitionController._shared_batcher = None
+        with contextlib.suppress(OSError):
+            os.remove(os.environ["BO_BATCH_STATS"])
+    if not windowed:
+        raise SystemExit(f"time windows: no affiliate has more than {max_pages * page_size} players to split")
+    for how, totals in split.items():
+        if totals.keys() != plain.keys():
+            raise SystemExit(f"time windows ({how}): {len(totals)} players, the unsplit crawl has {len(plain)}")
+        for key, figures in totals.items():
+            if any(abs(a - b) > 0.01 for a, b in zip(figures, plain[key])):
+                raise SystemExit(f"time windows ({how}): {key} sums to {figures}, unsplit {plain[key]}")
+    print(f"time windows: {len(plain)} players match the unsplit crawl, streamed and collected "
+          f"({windowed} windowed requests) ✓")
+
+
+def run_scale(dataset, scale, latency, page_size, workers, verbose, capacity=None, compress=True):
+    brands = sorted(set(main.SOCIAL_RANGES) | set(main.AFFILIATE_RANGES))
+    servers = {brand: BoStubServer(dataset, latency=latency, max_page_size=page_size, capacity=capacity,
+                                   compress=compress).start()
+               for brand in brands}
+    hosts = {server.base_url.split("//", 1)[1] for server in servers.values()}
+
+    # every brand points at its own stub host; keywords = brand, dest sheet, affiliates
+    AcquisitionController._socmedlinks = {b: s.links()["SocialMedia"] for b, s in servers.items()}
+    AcquisitionController._afflinks = {b: s.links()["Affiliates"] for b, s in servers.items()}
+    keywords = {}
+    for sheet_id, ranges in ((main.SOCIAL_SHEET_ID, main.SOCIAL_RANGES), (main.AFFILIATE_SHEET_ID, main.AFFILIATE_RANGES)):
+        for brand, rng in ranges.items():
+            keywords[rng] = [brand, sheet_id] + dataset.names
+    sink = SheetsSink(keywords)
+    SheetsClientFactory.service = classmethod(lambda cls, *args, **kwargs: sink)
+    SheetsClientFactory.drive = classmethod(lambda cls, *args, **kwargs: sink)
+    KeywordCache.PATH = KeywordCache.PATH.with_name(f"keywords-{scale}x.json")   # under WORKDIR
+    SheetSchema.CACHE = SheetSchema.CACHE.with_name(f"sheet_formats-{scale}x.json")   # under WORKDIR
+    SheetSchema._formatted = None
+
+    def counters():
+        totals = {"requests": 0, "logins": 0, "bytes": 0, "throttled": 0}
+        for server in servers.values():
+            for key, value in server.counters().items():
+                totals[key] += value
+        transport = BoSessionManager.transport_stats()
+        totals["connections"] = sum(transport[h]["connections"] for h in hosts if h in transport)
+        return totals
+
+    results = []
+    try:
+        for name, stage in STAGES:
+            before, rows_before, calls_before = counters(), sink.rows_written(), dict(sink.calls)
+            out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with out, RssSampler() as rss:
+                started = time.perf_counter()
+                stage(workers)
+                wall = time.perf_counter() - started
+            after, rows = counters(), sink.rows_written() - rows_before
+            results.append({
+                "scale": scale,
+                "stage": name,
+                "bo_requests": after["requests"] - before["requests"],
+                "logins": after["logins"] - before["logins"],
+                "throttled": after["throttled"] - before["throttled"],
+                "connections": after["connections"] - before["connections"],
+                "bo_mib": round((after["bytes"] - before["bytes"]) / 2**20, 2),
+                "rows": rows,
+                "wall_s": round(wall, 3),
+                "rows_per_s": round(rows / wall, 1) if wall else None,
+                "peak_rss_mib": round(rss.peak / 2**20, 1),
+                "sheets_calls": {k: v - calls_before.get(k, 0) for k, v in sink.calls.items() if v != calls_before.get(k, 0)},
+            })
+    finally:
+        for server in servers.values():
+            server.stop()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of main.process_sheet on local stubs.")
+    parser.add_argument("--input", default=os.path.join(ROOT, "bo_response.json"))
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated dataset multipliers")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub BO seconds per report request")
+    parser.add_argument("--page-size", type=int, default=100, help="largest page the stub BO serves")
+    parser.add_argument("--capacity", type=int, help="concurrent report requests a stub host serves before answering 429")
+    parser.add_argument("--no-gzip", action="store_true", help="stub hosts send uncompressed report bodies")
+    parser.add_argument("--workers", type=int, default=main.BRAND_WORKERS, help="brands processed in parallel")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = []
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        dataset = BoDataset.from_file(args.input, scale)
+        check_fetch_dual(dataset, args.latency, args.page_size, args.verbose)
+        check_time_windows(dataset, args.latency, args.verbose)
+        results.extend(run_scale(dataset, scale, args.latency, args.page_size, args.workers, args.verbose,
+                                 capacity=args.capacity, compress=not args.no_gzip))
+
+    header = f"{'scale':>5} {'stage':<12} {'requests':>8} {'429s':>6} {'logins':>6} {'conns':>6} {'BO MiB':>7} {'rows':>9} {'wall s':>8} {'rows/s':>10} {'peak RSS MiB':>12}"
+    print(header)
+    print("─" * len(header))
+    for r in results:
+        print(f"{r['scale']:>4}× {r['stage']:<12} {r['bo_requests']:>8} {r['throttled']:>6} {r['logins']:>6} {r['connections']:>6} "
+              f"{r['bo_mib']:>7.2f} {r['rows']:>9} "
+              f"{r['wall_s']:>8.2f} {r['rows_per_s'] or 0:>10,.0f} {r['peak_rss_mib']:>12.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
@@ -0,0 +1,108 @@
+"""
+projector_bench.py — RowProjector vs. the old dict‑then‑list row building
+
+    python benchmarks/projector_bench.py                  # bo_response.json, 200 rounds
+    python benchmarks/projector_bench.py --rounds 1000 --scale 10
+
+bo_response.json holds rows that were already filtered to friendly column
+names, so the raw ``aaData`` rows are rebuilt by inverting each helper's
+field map (keys the sample lacks come back as ``None``, as the BO sends
+them). Each schema is timed twice over the same raw rows: the previous
+``filter_rows`` dict comprehension followed by the ``main.build_*_row``
+list, and ``RowProjector.project_rows``. The outputs are compared before
+anything is timed.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.byPlayer import ByPlayer
+from helpers.byAffiliate import ByAffiliate
+from helpers.byAffiliateSocialMedia import ByAffiliateSocialMedia
+
+SHEET_DATE = "14/07/2025"
+
+
+# ────────────────── previous implementation ──────────────────
+def legacy_filter_rows(field_map, rows):
+    cleaned_rows = []
+    for row in rows:
+        cleaned_rows.append({
+            pretty: row.get(raw)
+            for raw, pretty in field_map.items()
+        })
+    return cleaned_rows
+
+def build_social_row(rec, sheet_date):
+    return [
+        sheet_date, "", rec["affiliate_username"], rec["currency"],
+        rec["player_username"], rec["total_deposit"], rec["total_withdrawal"],
+        rec["total_number_of_bets"], rec["total_turnover"],
+        rec["total_profit_and_loss"], rec["total_bonus"]
+    ]
+
+def build_affiliate_row(rec, sheet_date):
+    return [
+        sheet_date, "", rec["affiliate_username"], rec["currency"],
+        rec["registered_users"], rec["number_of_fd"], rec["first_deposit"],
+        rec["active_player"], rec["total_deposit"],
+        rec.get("total_withdrawal", ""), rec.get("total_turnover", ""),
+        rec.get("total_profit_and_loss", ""), rec.get("total_bonus", ""),
+    ]
+
+def build_affiliate_row_socmed(rec, sheet_date):
+    return [
+        sheet_date, "", rec["affiliate_username"], rec["currency"],
+        rec["registered_users"], rec["number_of_fd"], rec["first_deposit"],
+        rec["active_player"]
+    ]
+
+
+SCHEMAS = [
+    ("ByPlayer", ByPlayer, build_social_row),
+    ("ByAffiliate", ByAffiliate, build_affiliate_row),
+    ("ByAffiliateSocialMedia", ByAffiliateSocialMedia, build_affiliate_row_socmed),
+]
+
+
+def raw_rows(records, field_map):
+    """Invert ``field_map`` to turn friendly records back into raw BO rows."""
+    return [{raw: rec.get(pretty) for raw, pretty in field_map.items()} for rec in records]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the schema-driven row projector.")
+    parser.add_argument("--input", default="bo_response.json")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=1, help="repeat the sample rows this many times")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as fh:
+        records = json.load(fh)["data"] * max(1, args.scale)
+
+    print(f"{len(records)} rows × {args.rounds} rounds")
+    for name, helper_cls, build in SCHEMAS:
+        helper = helper_cls()
+        rows = raw_rows(records, helper.field_map)
+
+        def legacy():
+            return [build(rec, SHEET_DATE) for rec in legacy_filter_rows(helper.field_map, rows)]
+
+        def projected():
+            return helper.project_rows(rows, SHEET_DATE)
+
+        assert [list(r) for r in projected()] == legacy(), f"{name}: projector output differs"
+
+        old = min(timeit.repeat(legacy, number=args.rounds, repeat=3))
+        new = min(timeit.repeat(projected, number=args.rounds, repeat=3))
+        per_row = 1e9 / (len(rows) * args.rounds)
+        print(f"{name:<24} legacy {old * per_row:8.1f} ns/row   projector {new * per_row:8.1f} ns/row"
+              f"   ×{old / new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
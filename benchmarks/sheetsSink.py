@@ -0,0 +1,160 @@
+# sheetsSink.py
+import re
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class _Call:
+    def __init__(self, fn: Callable[[], Any]):
+        self._fn = fn
+
+    def execute(self, *args, **kwargs):
+        return self._fn()
+
+
+class SheetsSink:
+    """
+    In‑memory stand‑in for the Sheets v4 (and Drive v3 ``files.get``)
+    service objects handed out by :class:`SheetsClientFactory`.
+
+    Tabs live in ``tabs[(spreadsheet_id, tab)]`` as lists of rows and are
+    created on first write. Keyword ranges are read from ``keywords``
+    (``{a1_range: [value, ...]}``) so a benchmark can seed what
+    ``get_keywords_batch`` returns. ``calls`` counts API calls by method.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] | None = None):
+        self.keywords = keywords or {}
+        self.tabs: Dict[Tuple[str, str], List[List[Any]]] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # service entry points ------------------------------------------------
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def files(self):
+        return _Files(self)
+
+    # bookkeeping ---------------------------------------------------------
+    def rows_written(self) -> int:
+        with self._lock:
+            return sum(len(rows) for rows in self.tabs.values())
+
+    def count(self, method: str) -> None:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    @staticmethod
+    def split_range(a1: str) -> Tuple[str, str]:
+        tab, _, cells = a1.rpartition("!")
+        return tab.strip("'\""), cells
+
+
+class _Spreadsheets:
+    def __init__(self, sink: SheetsSink):
+        self.sink = sink
+
+    def values(self):
+        return _Values(self.sink)
+
+    def get(self, spreadsheetId, **kwargs):
+        def run():
+            self.sink.count("spreadsheets.get")
+            with self.sink._lock:
+                titles = [tab for sid, tab in self.sink.tabs if sid == spreadsheetId]
+            return {"sheets": [{"properties": {"title": t, "sheetId": i}} for i, t in enumerate(titles)]}
+        return _Call(run)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def run():
+            self.sink.count("spreadsheets.batchUpdate")
+            replies = []
+            for request in body.get("requests", []):
+                title = request.get("addSheet", {}).get("properties", {}).get("title")
+                if title is not None:
+                    with self.sink._lock:
+                        self.sink.tabs.setdefault((spreadsheetId, title), [])
+                        sheet_id = len(self.sink.tabs)
+                    replies.append({"addSheet": {"properties": {"title": title, "sheetId": sheet_id}}})
+                else:
+                    replies.append({})
+            return {"replies": replies}
+        return _Call(run)
+
+
+class _Values:
+    def __init__(self, sink: SheetsSink):
+        self.sink = sink
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        def run():
+            self.sink.count("values.append")
+            tab, _ = SheetsSink.split_range(range)
+            with self.sink._lock:
+                rows = self.sink.tabs.setdefault((spreadsheetId, tab), [])
+                start = len(rows) + 1
+                rows.extend(list(row) for row in body.get("values", []))
+                end = len(rows)
+            return {"updates": {"updatedRange": f"'{tab}'!A{start}:Z{end}", "updatedRows": end - start + 1}}
+        return _Call(run)
+
+    def get(self, spreadsheetId, range, **kwargs):
+        def run():
+            self.sink.count("values.get")
+            return {"range": range, "values": self._read(spreadsheetId, range)}
+        return _Call(run)
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        def run():
+            self.sink.count("values.batchGet")
+            return {"valueRanges": [{"range": r, "values": self._read(spreadsheetId, r)} for r in ranges]}
+        return _Call(run)
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        def run():
+            self.sink.count("values.update")
+            self._write(spreadsheetId, range, body.get("values", []))
+            return {"updatedRange": range}
+        return _Call(run)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def run():
+            self.sink.count("values.batchUpdate")
+            for data in body.get("data", []):
+                self._write(spreadsheetId, data["range"], data.get("values", []))
+            return {"totalUpdatedRows": sum(len(d.get("values", [])) for d in body.get("data", []))}
+        return _Call(run)
+
+    def _read(self, spreadsheet_id: str, a1: str) -> List[List[Any]]:
+        if a1 in self.sink.keywords:
+            return [[value] for value in self.sink.keywords[a1]]
+        tab, cells = SheetsSink.split_range(a1)
+        bounds = [int(n) for n in re.findall(r"[A-Z]+(\d+)", cells)]   # A5:E9 -> rows 5..9; A:A -> all
+        with self.sink._lock:
+            rows = self.sink.tabs.get((spreadsheet_id, tab), [])
+            if bounds:
+                rows = rows[bounds[0] - 1:bounds[-1]]
+            return [list(row) for row in rows]
+
+    def _write(self, spreadsheet_id: str, a1: str, values: List[List[Any]]) -> None:
+        tab, cells = SheetsSink.split_range(a1)
+        match = re.search(r"(\d+)", cells)
+        first = int(match.group(1)) if match else 1
+        with self.sink._lock:
+            rows = self.sink.tabs.setdefault((spreadsheet_id, tab), [])
+            while len(rows) < first - 1 + len(values):
+                rows.append([])
+            for offset, row in enumerate(values):
+                rows[first - 1 + offset] = list(row)
+
+
+class _Files:
+    def __init__(self, sink: SheetsSink):
+        self.sink = sink
+
+    def get(self, fileId, **kwargs):
+        def run():
+            self.sink.count("drive.files.get")
+            return {"modifiedTime": "1970-01-01T00:00:00.000Z"}
+        return _Call(run)
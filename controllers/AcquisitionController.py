@@ -1,17 +1,28 @@
 import math
 import hashlib
 import logging, hashlib, traceback
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import requests
 import re, hashlib, traceback, time, requests, logging
-from bs4 import BeautifulSoup
+from api.sessionManager import BoSessionManager
 from helpers.byPlayer import ByPlayer
 from helpers.byAffiliate import ByAffiliate
 from helpers.byAffiliateSocialMedia import ByAffiliateSocialMedia
-from api.getRequest import BoDataAPI
+from api.getRequest import BoDataAPI, stream_pages
+from api.batchPlanner import AdaptiveBatcher
+from api.responseCache import ResponseCache
+from api.payloadDecoder import PayloadDecoder
+from helpers.checkpointJournal import CheckpointJournal
+from helpers.historyStore import HistoryStore
+from helpers.metrics import Metrics
 
 class AcquisitionController:
+    # data_type -> helper whose raw columns that BO report is decoded down to
+    _report_fields = {"SocialMedia": ByPlayer, "Affiliates": ByAffiliate}
+
     _socmedlinks = {
         "BAJI": [
             "https://bjabo8888.com/page/manager/login.jsp",
@@ -70,6 +81,8 @@ class AcquisitionController:
         brand: str,
         targetdate: str,
         max_retries: int = 3,
+        checkpoint: Optional[CheckpointJournal] = None,
+        history: Optional[HistoryStore] = None,
     ):
         self.email = email
         self.password = password
@@ -79,15 +92,24 @@ class AcquisitionController:
         self._currency_type = currency_type
         self.max_retries = max_retries
 
-        self.session = requests.Session()
+        self.session = None  # shared per‑host session, attached by _authenticate()
         self.cookies = None  # populated after _authenticate()
+        self._session_manager = None
+        self.requests_made = 0  # BO report GETs across every fetch on this instance
+        self.failed_pages = 0   # pages given up on after retries, across every fetch
+        self.checkpoint = checkpoint   # run journal: resumed fetches skip what it already holds
+        self.history = history         # local copy of every filtered day, for history queries
+        self.metrics = Metrics.shared()
 
     # ────────────────────────────────────────────────────────────
     # Public helper: fetch every keyword in batches of five
     # ────────────────────────────────────────────────────────────
-    def fetch_bo_batched(self, type: str, keywords: List[str], targetdate:str, batch_size: int = 3, page_size: int = 100):
+    def fetch_bo_batched(self, type: str, keywords: List[str], targetdate:str, batch_size: Optional[int] = None, page_size: int = 100,
+                         end_date: Optional[str] = None):
         """
-        Fetch BO data for an arbitrary keyword list, five at a time.
+        Fetch BO data for an arbitrary keyword list. ``batch_size=None``
+        sizes the userId batches adaptively from learned per‑ID row counts;
+        ``end_date`` queries one targetdate…end_date window instead of a day.
         Returns: dict(status, text, data=[…], total=int)
         """
         if not keywords:
@@ -150,57 +172,176 @@ class AcquisitionController:
         #             break
         #         page += 1
 
-        print("Initialized API for fetching data...")
-        api = BoDataAPI(session=self.session,cookies=self.cookies,currency_type=self._currency_type, page_size=page_size)
-        print("-------------------------------------------------------------------------------------")
-        print("Initialized API for fetching data completed...")
-        print("-------------------------------------------------------------------------------------")
+        def new_api(data_type=None):
+            return self._new_api(page_size, data_type)
+        log, labels = self.metrics.log, dict(brand=self.brand, type=type)
         # ---- end of batches ----------------------------------------------- 
         # 🔄  Delegate filtering/renaming to the helper
-        print("Identifying processing type:", type)
+        filtered_rows_socmed = []
         if type == "SocialMedia":
-            print("Collecting SocialMedia data for player...")
-            all_rows_socmed_player = api.fetch(endpoint=urls[2],data_type="SocialMedia", keywords=keywords,target_date=targetdate, batch_size=batch_size)
-            byPlayer = ByPlayer()   # Import the helper class
-            filtered_rows = byPlayer.filter_rows(all_rows_socmed_player)
-            print("-------------------------------------------------------------------------------------")
-            print("Collecting SocialMedia data for player completed...")
-            print("-------------------------------------------------------------------------------------")
-            print("Collecting SocialMedia data for affiliates...")
-            all_rows_socmend_aff = api.fetch(endpoint=urls[3],data_type="Affiliates", keywords=keywords,target_date=targetdate, batch_size=batch_size)
-            byAffliateSocmed = ByAffiliateSocialMedia()  # Import the helper class
-            filtered_rows_socmed = byAffliateSocmed.filter_rows(all_rows_socmend_aff)
-            print("-------------------------------------------------------------------------------------")
-            print("Collecting SocialMedia data for affiliates completed...")
-            print("-------------------------------------------------------------------------------------")
+            # one login, both reports crawled side by side on the same session
+            log(Metrics.BATCH, "Collecting SocialMedia data for player + affiliates...")
+            player_api, aff_api = new_api("SocialMedia"), new_api("Affiliates")
+            with self.metrics.span("fetch", **labels) as span, ThreadPoolExecutor(max_workers=2) as pool:
+                player_job = pool.submit(player_api.fetch, endpoint=urls[2], data_type="SocialMedia", keywords=keywords, target_date=targetdate, batch_size=batch_size, end_date=end_date)
+                aff_job = pool.submit(aff_api.fetch, endpoint=urls[3], data_type="Affiliates", keywords=keywords, target_date=targetdate, batch_size=batch_size, end_date=end_date)
+                all_rows_socmed_player = player_job.result()
+                all_rows_socmend_aff = aff_job.result()
+                span["rows"] = len(all_rows_socmed_player) + len(all_rows_socmend_aff)
+            with self.metrics.span("transform", **labels) as span:
+                byPlayer = ByPlayer()   # Import the helper class
+                filtered_rows = byPlayer.filter_rows(all_rows_socmed_player)
+                byAffliateSocmed = ByAffiliateSocialMedia()  # Import the helper class
+                filtered_rows_socmed = byAffliateSocmed.filter_rows(all_rows_socmend_aff)
+                span["rows"] = len(filtered_rows) + len(filtered_rows_socmed)
+            if end_date is None:
+                self._record("SocialMedia", targetdate, filtered_rows)
+                self._record("Affiliates", targetdate, filtered_rows_socmed)
+            request_count = player_api.request_count + aff_api.request_count
+            self.failed_pages += player_api.failed_pages + aff_api.failed_pages
         else:
-            print("Collecting Affiliate data...")
-            all_rows_aff = api.fetch(endpoint=urls[2],data_type="Affiliates", keywords=keywords,target_date=targetdate, batch_size=batch_size)
-            byAffliate = ByAffiliate()  # Import the helper class
-            filtered_rows = byAffliate.filter_rows(all_rows_aff)    
-            print("-------------------------------------------------------------------------------------")
-            print("Collecting Affiliate data completed...")
-            print("-------------------------------------------------------------------------------------")
-        print("Fetching Completed.......:", type)
-        print("-------------------------------------------------------------------------------------")
+            log(Metrics.BATCH, "Collecting Affiliate data...")
+            api = new_api("Affiliates")
+            with self.metrics.span("fetch", **labels) as span:
+                all_rows_aff = api.fetch(endpoint=urls[2],data_type="Affiliates", keywords=keywords,target_date=targetdate, batch_size=batch_size, end_date=end_date)
+                span["rows"] = len(all_rows_aff)
+            with self.metrics.span("transform", **labels) as span:
+                byAffliate = ByAffiliate()  # Import the helper class
+                filtered_rows = byAffliate.filter_rows(all_rows_aff)
+                span["rows"] = len(filtered_rows)
+            if end_date is None:
+                self._record("Affiliates", targetdate, filtered_rows)
+            request_count = api.request_count
+            self.failed_pages += api.failed_pages
+        self.requests_made += request_count
+        cache = ResponseCache.shared().stats()
+        log(Metrics.INFO, f"[{self.brand}] Fetching completed: {type} | BO requests: {request_count} "
+                          f"| cache hits/misses: {cache['hits']}/{cache['misses']}")
         return {
             "status": 200,
             "text": "Data fetched and filtered successfully.",
             "data": filtered_rows,
-            "data_socmed": filtered_rows_socmed if type == "SocialMedia" else [],
+            "data_socmed": filtered_rows_socmed,
             "total": len(filtered_rows),
+            "requests": request_count,
         }
 
     # ────────────────────────────────────────────────────────────
-    # Internal: sign‑in once per controller instance
+    # Public helper: stream filtered pages as they arrive
+    # ────────────────────────────────────────────────────────────
+    def stream_bo_batched(self, type: str, keywords: List[str], targetdate: str, batch_size: Optional[int] = None,
+                          page_size: int = 100, end_date: Optional[str] = None, max_buffered_pages: int = 8,
+                          sheet_date: Optional[str] = None):
+        """
+        Generator flavour of :meth:`fetch_bo_batched`. Yields
+        ``("data" | "data_socmed", unit, rows)`` with each BO page already
+        filtered, as soon as the page arrives (``unit`` keys the page in
+        the run's checkpoint journal); at most ``max_buffered_pages``
+        pages are held in memory, whatever the size of the result.
+
+        With ``sheet_date`` the rows come out as sheet‑ready tuples
+        (:meth:`RowProjector.project_rows`) instead of dicts. Single‑day
+        pages also go to the history store as they pass through.
+        """
+        if not keywords:
+            return
+        if not self._authenticate(type):
+            raise RuntimeError("Authentication failed.")
+
+        link_dict = self._socmedlinks if type == "SocialMedia" else self._afflinks
+        urls = link_dict.get(self.brand)
+        if not urls or len(urls) < 2:
+            raise ValueError(f"No login URLs found for brand: {self.brand}")
+
+        common = dict(keywords=keywords, target_date=targetdate, batch_size=batch_size, end_date=end_date)
+        if type == "SocialMedia":
+            reports = [("data", ByPlayer(), urls[2], "SocialMedia"),
+                       ("data_socmed", ByAffiliateSocialMedia(), urls[3], "Affiliates")]
+        else:
+            reports = [("data", ByAffiliate(), urls[2], "Affiliates")]
+        jobs = [
+            (self._new_api(page_size, data_type), (kind, helper, data_type), dict(endpoint=endpoint, data_type=data_type, **common))
+            for kind, helper, endpoint, data_type in reports
+        ]
+
+        # time blocked on the BO vs. spent projecting, accumulated per page
+        fetch_s = transform_s = 0.0
+        received = 0
+        pages = stream_pages(jobs, max_buffered_pages=max_buffered_pages)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    (kind, helper, data_type), unit, rows = next(pages)
+                except StopIteration:
+                    break
+                projected = time.perf_counter()
+                fetch_s += projected - started
+                received += len(rows)
+                if sheet_date is None:
+                    out = helper.filter_rows(rows)
+                else:
+                    out = helper.project_rows(rows, sheet_date)
+                transform_s += time.perf_counter() - projected
+                if end_date is None:
+                    self._record(data_type, targetdate, out, None if sheet_date is None else helper.columns)
+                yield kind, unit, out
+        finally:
+            pages.close()
+            self.requests_made += sum(api.request_count for api, _, _ in jobs)
+            self.failed_pages += sum(api.failed_pages for api, _, _ in jobs)
+            self.metrics.stage("fetch", fetch_s, received, brand=self.brand, type=type)
+            self.metrics.stage("transform", transform_s, received, brand=self.brand, type=type)
+
+    def _record(self, data_type: str, targetdate: str, rows: list, columns=None) -> None:
+        """
+        Copy one day's filtered rows into the history store – dicts, or
+        projected sheet tuples in ``columns`` order. Windowed fetches are
+        never recorded: they are not a day's snapshot.
+        """
+        if self.history is None or not rows:
+            return
+        dataset = HistoryStore.REPORTS[data_type]
+        if columns is None:
+            self.history.add(dataset, self.brand, targetdate, rows)
+        else:
+            self.history.add_projected(dataset, self.brand, targetdate, columns, rows)
+
+    def _new_api(self, page_size: int, data_type: Optional[str] = None) -> BoDataAPI:
+        # pages are decoded down to the columns read from that report; the
+        # affiliate report keeps ByAffiliate's superset so both passes share its cached pages
+        helper = self._report_fields.get(data_type)
+        decoder = PayloadDecoder(fields=helper.DEFAULT_FIELD_MAP if helper is not None else None)
+        return BoDataAPI(session=self.session,cookies=self.cookies,currency_type=self._currency_type, page_size=page_size,
+                         reauth=self._session_manager.refresh, batcher=self._batcher(page_size),
+                         cache=ResponseCache.shared(), cache_scope=self.brand, decoder=decoder,
+                         checkpoint=self.checkpoint)
+
+    # ────────────────────────────────────────────────────────────
+    # Internal: one adaptive batcher per process, shared by all brands
+    # ────────────────────────────────────────────────────────────
+    _shared_batcher: Optional[AdaptiveBatcher] = None
+    _batcher_lock = threading.Lock()
+
+    @classmethod
+    def _batcher(cls, page_size: int) -> AdaptiveBatcher:
+        # brand threads race here; two batchers would overwrite each other's saved stats
+        with cls._batcher_lock:
+            if cls._shared_batcher is None or cls._shared_batcher.page_size != page_size:
+                cls._shared_batcher = AdaptiveBatcher(page_size=page_size)
+            return cls._shared_batcher
+
+    # ────────────────────────────────────────────────────────────
+    # Internal: sign‑in once per BO host, shared across controllers
     # ────────────────────────────────────────────────────────────
     def _authenticate(self, type) -> bool:
         """
-        Login + capture cookies.
+        Attach the host's shared, logged‑in session and its cookies.
         Returns True on success, False on ANY failure,
         while printing the full error/traceback.
         """
-        print("Authenticating user")          # keep your console cue
+        self.metrics.log(Metrics.BATCH, "Authenticating user")          # keep your console cue
+        started = time.perf_counter()
         try:
             # -------- 0) Choose brand‑specific URLs --------
             link_dict = self._socmedlinks if type == "SocialMedia" else self._afflinks
@@ -209,39 +350,19 @@ class AcquisitionController:
             if not urls or len(urls) < 2:
                 raise ValueError(f"No login URLs found for brand: {self.brand}")
 
-            print(f"Using URLs: {urls[0]} and {urls[1]}")
-            # -------- 1) GET login page --------
-            self.session.cookies.clear()  # <- force fresh login
-            resp = self.session.get(urls[0], timeout=10)
-            resp.raise_for_status()            # throws for 4xx / 5xx
-            # time.sleep(3)  # avoid hammering the server
-            # -------- 2) Scrape randomCode --------
-            soup = BeautifulSoup(resp.text, "html.parser")
-            random_tag = soup.find("input", {"id": "randomCode"})
-            if random_tag is None:
-                raise RuntimeError("randomCode input not found on login page.")
-            random_code_val = random_tag["value"]
-
-            # -------- 3) POST credentials --------
-            auth_payload = {
-                "username": self.email,
-                "password": hashlib.sha1(self.password.encode()).hexdigest(),
-                "randomCode": random_code_val,
-            }
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                "Accept": "*/*",
-            }
-            login = self.session.post(urls[1], data=auth_payload,
-                                    headers=headers, timeout=10)
-            login.raise_for_status()
-
-            # -------- 4) Success --------
-            self.cookies = self.session.cookies.get_dict()
-            print("Authentication successful.")
+            self.metrics.log(Metrics.BATCH, f"Using URLs: {urls[0]} and {urls[1]}")
+            # -------- 1) Reuse (or create) the host session --------
+            self._session_manager = BoSessionManager.for_host(
+                login_page_url=urls[0], login_url=urls[1],
+                username=self.email, password=self.password,
+            )
+            self.session = self._session_manager.session
+            self.cookies = self._session_manager.ensure()
+            self.metrics.log(Metrics.BATCH, "Authentication successful.")
+            self.metrics.stage("auth", time.perf_counter() - started, brand=self.brand, type=type)
             return True
 
         except (requests.RequestException, Exception) as e:
             # Print full traceback so you immediately see *where* it failed
-            print("Authentication error:\n%s", traceback.format_exc())
+            self.metrics.log(Metrics.WARN, f"Authentication error:\n{traceback.format_exc()}")
             return False
@@ -4,10 +4,9 @@ import time
 import re
 import random
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.service_account import Credentials
-from config.config import Config
+from helpers.sheetsClient import SheetsClientFactory
+from helpers.keywordCache import KeywordCache
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -21,11 +20,8 @@ class SpreadsheetController:
 
     def get_keywords(self):
         print("Fetching accounts from spreadsheet...")
-        config_dict = Config.as_dict()
-        scope = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-        creds = Credentials.from_service_account_info(config_dict, scopes=scope)
         try:
-            service = build('sheets', 'v4', credentials=creds)
+            service = SheetsClientFactory.service()
             sheet = service.spreadsheets()
             result = sheet.values().get(spreadsheetId=self.spreadsheet, range=self.range).execute()
             rows = result.get("values", [])# list[list[str]]
@@ -38,4 +34,58 @@ class SpreadsheetController:
             print(f"An error occurred: {err}")
             return []
 
+    def get_keywords_batch(self, ranges, cache: Optional[KeywordCache] = None):
+        """
+        Read several keyword ranges of this spreadsheet with one
+        ``values.batchGet``. ``ranges`` maps a name (brand) to an A1 range;
+        returns ``{name: keywords}``. Results go through a local
+        :class:`KeywordCache` that is revalidated by TTL, then by the
+        file's Drive ``modifiedTime``.
+        """
+        cache = cache or KeywordCache()
+        a1_ranges = list(ranges.values())
+
+        if cache.is_fresh(self.spreadsheet, a1_ranges):
+            cached = cache.get(self.spreadsheet, a1_ranges)
+            print(f"Keywords for {len(ranges)} ranges served from cache.")
+            return {name: cached[rng] for name, rng in ranges.items()}
+
+        modified_time = self._modified_time()
+        cached = cache.get(self.spreadsheet, a1_ranges, modified_time=modified_time)
+        if cached is not None:
+            print(f"Keywords for {len(ranges)} ranges unchanged since last read (modifiedTime {modified_time}).")
+            return {name: cached[rng] for name, rng in ranges.items()}
+
+        print(f"Fetching accounts for {len(ranges)} ranges from spreadsheet...")
+        try:
+            service = SheetsClientFactory.service()
+            result = service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet, ranges=a1_ranges
+            ).execute()
+        except HttpError as err:
+            print(f"An error occurred: {err}")
+            return {name: [] for name in ranges}
+
+        by_range = {}
+        for rng, value_range in zip(a1_ranges, result.get("valueRanges", [])):
+            rows = value_range.get("values", [])
+            # ────────── flatten and strip blanks ──────────
+            by_range[rng] = [row[0].strip() for row in rows if row and row[0].strip()]
+        cache.put(self.spreadsheet, by_range, modified_time)
+
+        keywords = {name: by_range.get(rng, []) for name, rng in ranges.items()}
+        for name, kw in keywords.items():
+            print(f"Found {len(kw)} keywords for {name} in range {ranges[name]}.")
+        return keywords
+
+    def _modified_time(self) -> Optional[str]:
+        """Drive modifiedTime of the spreadsheet, or None if Drive is unavailable."""
+        try:
+            meta = SheetsClientFactory.drive().files().get(
+                fileId=self.spreadsheet, fields="modifiedTime", supportsAllDrives=True
+            ).execute()
+            return meta.get("modifiedTime")
+        except Exception as err:
+            print(f"Could not read modifiedTime ({err}); falling back to TTL only.")
+            return None
 
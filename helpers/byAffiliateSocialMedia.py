@@ -1,7 +1,9 @@
 # helpers/by_player.py
-from typing import List, Dict, Any
+from typing import Dict
 
-class ByAffiliateSocialMedia:
+from helpers.rowProjector import RowProjector
+
+class ByAffiliateSocialMedia(RowProjector):
     """
     Format acquisition rows (by player) so each row only contains
     the business‑friendly columns we care about.
@@ -16,15 +18,3 @@ class ByAffiliateSocialMedia:
         "firstDeposit":           "first_deposit",
         "activePlayer":           "active_player",
     }
-
-    def __init__(self, field_map: Dict[str, str] | None = None) -> None:
-        self.field_map = field_map or self.DEFAULT_FIELD_MAP
-
-    def filter_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        cleaned_rows: list[dict] = []
-        for row in rows:
-            cleaned_rows.append({
-                pretty: row.get(raw)                # raw key comes from JSON
-                for raw, pretty in self.field_map.items()
-            })
-        return cleaned_rows
@@ -0,0 +1,129 @@
+# checkpointJournal.py
+import json
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from helpers.localFiles import sqlite_connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs   (run TEXT PRIMARY KEY, started_at REAL);
+CREATE TABLE IF NOT EXISTS plans  (run TEXT, scope TEXT, endpoint TEXT, batches TEXT,
+                                   PRIMARY KEY (run, scope, endpoint));
+CREATE TABLE IF NOT EXISTS pages  (run TEXT, unit TEXT, total INTEGER, body BLOB,
+                                   PRIMARY KEY (run, unit));
+CREATE TABLE IF NOT EXISTS writes (run TEXT, unit TEXT, spreadsheet TEXT, tab TEXT, rows INTEGER, written_at REAL,
+                                   PRIMARY KEY (run, unit));
+CREATE TABLE IF NOT EXISTS brands (run TEXT, brand TEXT, done_at REAL, PRIMARY KEY (run, brand));
+"""
+
+
+class CheckpointJournal:
+    """
+    Crash‑safe progress record for one pass (``type`` × target date ×
+    sheet date), kept in a local SQLite file so a failed run can be
+    resumed instead of redone.
+
+    * the keyword‑batch plan of every (brand, report), so a resumed run
+      asks the BO for exactly the same pages;
+    * every BO page fetched (rows + DataTables total), keyed by its
+      *unit* – brand, report, batch, split and page number;
+    * every unit whose rows reached their tab, recorded only after the
+      Sheets append that carried them succeeded;
+    * brands that finished end to end.
+
+    A fresh (non‑resume) run forgets its old entries; runs older than
+    ``BO_CHECKPOINT_KEEP_DAYS`` are pruned. ``BO_CHECKPOINT_DB=""``
+    turns journaling off.
+    """
+
+    PATH = os.getenv("BO_CHECKPOINT_DB", ".cache/checkpoints.sqlite")
+    KEEP_DAYS = float(os.getenv("BO_CHECKPOINT_KEEP_DAYS", "7"))
+
+    def __init__(self, run: str, resume: bool = False, path: Optional[str] = None):
+        self.run = run
+        self.resume = resume
+        self.path = Path(path or self.PATH)
+        self._db, self._lock = sqlite_connection(self.path, lambda db: db.executescript(SCHEMA))
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM runs WHERE started_at < ?", (time.time() - self.KEEP_DAYS * 86400,))
+            for table in ("plans", "pages", "writes", "brands"):
+                self._db.execute(f"DELETE FROM {table} WHERE run NOT IN (SELECT run FROM runs)")
+            if not resume:
+                for table in ("runs", "plans", "pages", "writes", "brands"):
+                    self._db.execute(f"DELETE FROM {table} WHERE run = ?", (run,))
+            self._db.execute("INSERT OR IGNORE INTO runs VALUES (?, ?)", (run, time.time()))
+
+    @classmethod
+    def open(cls, type: str, target_date: str, sheet_date: str, resume: bool = False) -> Optional["CheckpointJournal"]:
+        """The journal of one pass, or ``None`` when journaling is off (or the file cannot be opened)."""
+        if not cls.PATH:
+            return None
+        try:
+            return cls(f"{type}|{target_date}|{sheet_date}", resume=resume)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[checkpoint] journal unavailable, running without one ({e})")
+            return None
+
+    # ────────────────────────────────────────────────────────────
+    # Fetch side
+    # ────────────────────────────────────────────────────────────
+    def plan(self, scope: str, endpoint: str) -> Optional[List[List[str]]]:
+        row = self._one("SELECT batches FROM plans WHERE run = ? AND scope = ? AND endpoint = ?",
+                        (self.run, scope, endpoint))
+        return json.loads(row[0]) if row else None
+
+    def save_plan(self, scope: str, endpoint: str, batches: List[List[str]]) -> None:
+        self._write("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)",
+                    (self.run, scope, endpoint, json.dumps(batches)))
+
+    def page(self, unit: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+        """``(rows, total)`` of a page fetched earlier in this run, if any."""
+        row = self._one("SELECT total, body FROM pages WHERE run = ? AND unit = ?", (self.run, unit))
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[1])), row[0]
+
+    def record_page(self, unit: str, rows: List[Dict[str, Any]], total: Optional[int]) -> None:
+        body = zlib.compress(json.dumps(rows, separators=(",", ":"), default=str).encode(), 1)
+        self._write("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (self.run, unit, total, body))
+
+    # ────────────────────────────────────────────────────────────
+    # Write side
+    # ────────────────────────────────────────────────────────────
+    def written(self, unit: str) -> bool:
+        return self._one("SELECT 1 FROM writes WHERE run = ? AND unit = ?", (self.run, unit)) is not None
+
+    def mark_written(self, unit: str, spreadsheet: str, tab: str, rows: int) -> None:
+        self._write("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.run, unit, spreadsheet, tab, rows, time.time()))
+
+    def brand_done(self, brand: str) -> bool:
+        return self._one("SELECT 1 FROM brands WHERE run = ? AND brand = ?", (self.run, brand)) is not None
+
+    def finish_brand(self, brand: str) -> None:
+        self._write("INSERT OR REPLACE INTO brands VALUES (?, ?, ?)", (self.run, brand, time.time()))
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        for table in ("pages", "writes", "brands"):
+            counts[table] = self._one(f"SELECT COUNT(*) FROM {table} WHERE run = ?", (self.run,))[0]
+        return counts
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _one(self, sql: str, args: tuple) -> Optional[tuple]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()
+
+    def _write(self, sql: str, args: tuple) -> None:
+        try:
+            with self._lock, self._db:
+                self._db.execute(sql, args)
+        except sqlite3.Error as e:
+            # a lost checkpoint only costs a refetch on resume; never fail the run for it
+            print(f"[checkpoint] could not record progress ({e})")
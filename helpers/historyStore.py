@@ -0,0 +1,184 @@
+# historyStore.py
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from helpers.byAffiliate import ByAffiliate
+from helpers.byPlayer import ByPlayer
+from helpers.localFiles import sqlite_connection
+
+
+class HistoryStore:
+    """
+    Local, indexed copy of every filtered BO row the runs produce, so
+    trend questions never have to page history back out of the Sheets.
+
+    One SQLite table per dataset, columns straight from the projector's
+    field map:
+
+    * ``player``    – :class:`ByPlayer` rows, one per (brand, date,
+      affiliate, currency, player);
+    * ``affiliate`` – :class:`ByAffiliate` rows, one per (brand, date,
+      affiliate, currency). The SocialMedia pass's affiliate rows carry a
+      subset of these columns and only fill in what they have.
+
+    Rows are upserted, so re‑running or resuming a day never duplicates
+    it. ``date`` is ISO ``YYYY-MM-DD``; the primary keys double as the
+    (brand, date, …) index behind brand queries, and each dataset has an
+    index on the column its history query looks rows up by (``LOOKUPS``).
+    ``BO_HISTORY_DB=""`` turns the store off.
+    """
+
+    PATH = os.getenv("BO_HISTORY_DB", "data/history.sqlite")
+
+    # dataset -> (projector with the column schema, key columns after brand/date)
+    DATASETS: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+        "player": (ByPlayer, ("affiliate_username", "currency", "player_username")),
+        "affiliate": (ByAffiliate, ("affiliate_username", "currency")),
+    }
+    # dataset -> columns of the index behind its per‑entity history query
+    LOOKUPS: Dict[str, Tuple[str, ...]] = {
+        "player": ("player_username", "date"),
+        "affiliate": ("affiliate_username", "date"),
+    }
+    # BO report (data_type) -> dataset its filtered rows are stored in
+    REPORTS = {"SocialMedia": "player", "Affiliates": "affiliate"}
+    TEXT_COLUMNS = {"affiliate_username", "currency", "player_username"}
+    # affiliate columns summed per brand and day
+    BRAND_TOTALS = ("registered_users", "number_of_fd", "first_deposit", "active_player", "total_deposit",
+                    "total_withdrawal", "total_turnover", "total_profit_and_loss", "total_bonus")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or self.PATH)
+        self._db, self._lock = sqlite_connection(self.path, self._setup)
+
+    @classmethod
+    def open(cls) -> Optional["HistoryStore"]:
+        """The configured store, or ``None`` when it is off (or cannot be opened)."""
+        if not cls.PATH:
+            return None
+        try:
+            return cls()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[history] store unavailable, not recording ({e})")
+            return None
+
+    @staticmethod
+    def iso_day(day: str) -> str:
+        """``YYYY/MM/DD``, ``DD/MM/YYYY`` or ``YYYY-MM-DD`` -> ``YYYY-MM-DD``."""
+        for fmt in ("%Y/%m/%d", "%d/%m/%Y", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(day.split(" ")[0], fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        raise ValueError(f"Unrecognised date: {day}")
+
+    # ────────────────────────────────────────────────────────────
+    # Loading
+    # ────────────────────────────────────────────────────────────
+    def add(self, dataset: str, brand: str, day: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Upsert ``{column: value}`` records (``filter_rows`` output) for one brand and day."""
+        records = list(records)
+        if not records:
+            return 0
+        columns = [c for c in self._columns(dataset) if c in records[0]]
+        return self._upsert(dataset, brand, day, columns, ([rec.get(c) for c in columns] for rec in records))
+
+    def add_projected(self, dataset: str, brand: str, day: str, columns: Sequence[str],
+                      rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Upsert sheet rows as built by :meth:`RowProjector.project_rows`
+        – ``(sheet_date, "", *values)`` with ``values`` in ``columns`` order.
+        """
+        return self._upsert(dataset, brand, day, list(columns), (row[2:] for row in rows))
+
+    # ────────────────────────────────────────────────────────────
+    # Queries
+    # ────────────────────────────────────────────────────────────
+    def affiliate_history(self, affiliate: str, brand: Optional[str] = None, start: Optional[str] = None,
+                          end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One affiliate's daily rows, across brands unless ``brand`` is given, oldest first."""
+        where, args = self._range("affiliate_username = ?", [affiliate], brand, start, end)
+        return self._query(f"SELECT * FROM affiliate WHERE {where} ORDER BY date, brand, currency", args)
+
+    def player_history(self, player: str, brand: Optional[str] = None, start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Dict[str, Any]]:
+        where, args = self._range("player_username = ?", [player], brand, start, end)
+        return self._query(f"SELECT * FROM player WHERE {where} ORDER BY date, brand, currency", args)
+
+    def brand_history(self, brand: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per day and currency: affiliate count and the summed affiliate columns."""
+        where, args = self._range("1 = 1", [], brand, start, end)
+        sums = ", ".join(f"SUM({c}) AS {c}" for c in self.BRAND_TOTALS)
+        return self._query(
+            f"SELECT brand, date, currency, COUNT(*) AS affiliates, {sums} FROM affiliate "
+            f"WHERE {where} GROUP BY brand, date, currency ORDER BY date, currency", args)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Rows, brands and date span per dataset."""
+        out = {}
+        for dataset in self.DATASETS:
+            row = self._query(f"SELECT COUNT(*) AS rows, COUNT(DISTINCT brand) AS brands, "
+                              f"MIN(date) AS first, MAX(date) AS last FROM {dataset}", [])[0]
+            out[dataset] = row
+        return out
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _columns(self, dataset: str) -> Tuple[str, ...]:
+        return tuple(self.DATASETS[dataset][0].DEFAULT_FIELD_MAP.values())
+
+    def _upsert(self, dataset: str, brand: str, day: str, columns: List[str], values: Iterable[Sequence[Any]]) -> int:
+        keys = self.DATASETS[dataset][1]
+        names = ["brand", "date", *columns]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in keys) or "brand = excluded.brand"
+        sql = (f"INSERT INTO {dataset} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+               f"ON CONFLICT (brand, date, {', '.join(keys)}) DO UPDATE SET {updates}")
+        prefix = (brand, self.iso_day(day))
+        batch = [prefix + tuple(v) for v in values]
+        if not batch:
+            return 0
+        try:
+            with self._lock, self._db:
+                self._db.executemany(sql, batch)
+        except sqlite3.Error as e:
+            # history is a by‑product; the sheets write goes on without it
+            print(f"[history] could not store {len(batch)} {dataset} rows for {brand} ({e})")
+            return 0
+        return len(batch)
+
+    @staticmethod
+    def _range(condition: str, args: list, brand: Optional[str], start: Optional[str],
+               end: Optional[str]) -> Tuple[str, list]:
+        clauses = [condition]
+        if brand:
+            clauses.append("brand = ?")
+            args.append(brand)
+        if start:
+            clauses.append("date >= ?")
+            args.append(HistoryStore.iso_day(start))
+        if end:
+            clauses.append("date <= ?")
+            args.append(HistoryStore.iso_day(end))
+        return " AND ".join(clauses), args
+
+    def _query(self, sql: str, args: list) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db.execute(sql, args)
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    @classmethod
+    def _setup(cls, db: sqlite3.Connection) -> None:
+        for dataset, (projector, keys) in cls.DATASETS.items():
+            columns = ", ".join(f"{c} {'TEXT' if c in cls.TEXT_COLUMNS else 'NUMERIC'}"
+                                for c in projector.DEFAULT_FIELD_MAP.values())
+            db.execute(f"CREATE TABLE IF NOT EXISTS {dataset} (brand TEXT NOT NULL, date TEXT NOT NULL, "
+                       f"{columns}, PRIMARY KEY (brand, date, {', '.join(keys)}))")
+            lookup = cls.LOOKUPS[dataset]
+            db.execute(f"CREATE INDEX IF NOT EXISTS {dataset}_by_{lookup[0]} ON {dataset} ({', '.join(lookup)})")
+        # early stores indexed the affiliate table on (currency, date), which no query uses
+        db.execute("DROP INDEX IF EXISTS affiliate_by_currency")
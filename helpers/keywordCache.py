@@ -0,0 +1,86 @@
+# keywordCache.py
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from helpers.localFiles import atomic_write
+
+
+class KeywordCache:
+    """
+    Local copy of the keyword columns of a spreadsheet.
+
+    An entry is fresh for ``ttl`` seconds. Past that it is still reused if
+    the file's Drive ``modifiedTime`` has not moved since it was stored,
+    so a stale-but-unchanged sheet costs one metadata call instead of a
+    values read.
+    """
+
+    PATH = Path(os.getenv("KEYWORD_CACHE", ".cache/keywords.json"))
+    TTL_SECONDS = int(os.getenv("KEYWORD_CACHE_TTL", "3600"))
+
+    def __init__(self, path: Optional[Path] = None, ttl: Optional[int] = None):
+        self.path = Path(path or self.PATH)
+        self.ttl = self.TTL_SECONDS if ttl is None else ttl
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        spreadsheet_id: str,
+        ranges: List[str],
+        modified_time: Optional[str] = None,
+    ) -> Optional[Dict[str, List[str]]]:
+        """
+        Cached ``{range: keywords}`` for every range asked for, or ``None``.
+        ``modified_time`` (when known) revalidates an entry past its TTL.
+        """
+        entry = self._read().get(spreadsheet_id)
+        if not entry or any(rng not in entry["ranges"] for rng in ranges):
+            return None
+        fresh = time.time() - entry["fetched_at"] < self.ttl
+        unchanged = modified_time is not None and modified_time == entry.get("modified_time")
+        if not (fresh or unchanged):
+            return None
+        if unchanged and not fresh:
+            self._touch(spreadsheet_id)
+        return {rng: entry["ranges"][rng] for rng in ranges}
+
+    def is_fresh(self, spreadsheet_id: str, ranges: List[str]) -> bool:
+        entry = self._read().get(spreadsheet_id)
+        return bool(entry) and all(rng in entry["ranges"] for rng in ranges) \
+            and time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, spreadsheet_id: str, keywords: Dict[str, List[str]], modified_time: Optional[str] = None) -> None:
+        with self._lock:
+            data = self._read()
+            data[spreadsheet_id] = {
+                "fetched_at": time.time(),
+                "modified_time": modified_time,
+                "ranges": keywords,
+            }
+            self._write(data)
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _touch(self, spreadsheet_id: str) -> None:
+        with self._lock:
+            data = self._read()
+            if spreadsheet_id in data:
+                data[spreadsheet_id]["fetched_at"] = time.time()
+                self._write(data)
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: Dict[str, dict]) -> None:
+        try:
+            atomic_write(self.path, json.dumps(data))
+        except OSError as e:
+            print(f"[keywords] could not persist cache ({e})")
@@ -0,0 +1,54 @@
+# localFiles.py
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+_connections: Dict[str, Tuple[sqlite3.Connection, threading.Lock]] = {}
+_connections_lock = threading.Lock()
+
+
+def atomic_write(path: Path, data: Union[str, bytes], mode: Optional[int] = None) -> None:
+    """
+    Replace ``path`` with ``data`` in one step: the data goes to a temp
+    file unique to this process and thread, which is then renamed over
+    ``path``, so readers never see half a file and concurrent writers
+    never share a temp file. ``mode`` sets its permissions before the
+    rename. Raises ``OSError``; callers decide how much a lost write matters.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(data, bytes):
+            tmp.write_bytes(data)
+        else:
+            tmp.write_text(data)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def sqlite_connection(path: Path, setup: Callable[[sqlite3.Connection], None]) -> Tuple[sqlite3.Connection, threading.Lock]:
+    """
+    One connection per SQLite file, shared by every brand thread behind
+    the lock returned with it. The file is opened in WAL mode with
+    ``synchronous=NORMAL`` (durable across process crashes) and ``setup``
+    creates its schema, once per file and process.
+    """
+    path = Path(path)
+    key = str(path.resolve())
+    with _connections_lock:
+        if key not in _connections:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(key, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            setup(db)
+            db.commit()
+            _connections[key] = (db, threading.Lock())
+        return _connections[key]
@@ -0,0 +1,234 @@
+# metrics.py
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from helpers.localFiles import atomic_write
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """
+    Process‑wide run instrumentation.
+
+    * every BO request (latency, bytes, rows, status, cache hit), retry and
+      stage span (auth / keywords / fetch / transform / write per brand and
+      type) is aggregated in memory and, with ``BO_METRICS_JSONL`` set,
+      appended as one JSON object per line;
+    * :meth:`write_prometheus` renders the aggregates as a node_exporter
+      textfile (``BO_METRICS_PROM``), rewritten atomically;
+    * :meth:`log` replaces the hot‑path ``print`` calls, gated by
+      ``BO_VERBOSITY``: 0 warnings only, 1 one line per fetch/brand
+      (default), 2 per keyword batch, 3 per page and attempt.
+    """
+
+    WARN, INFO, BATCH, PAGE = 0, 1, 2, 3
+
+    VERBOSITY = int(os.getenv("BO_VERBOSITY", "1"))
+    JSONL_PATH = os.getenv("BO_METRICS_JSONL", "")
+    PROM_PATH = os.getenv("BO_METRICS_PROM", "")
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    _shared: Optional["Metrics"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, verbosity: Optional[int] = None, jsonl_path: Optional[str] = None,
+                 prom_path: Optional[str] = None):
+        self.verbosity = self.VERBOSITY if verbosity is None else verbosity
+        self.jsonl_path = Path(jsonl_path or self.JSONL_PATH) if (jsonl_path or self.JSONL_PATH) else None
+        self.prom_path = Path(prom_path or self.PROM_PATH) if (prom_path or self.PROM_PATH) else None
+        self.started_at = time.time()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Labels, list] = {}      # labels -> [bucket counts…, +Inf, sum]
+        self._lock = threading.Lock()
+        self._jsonl = None
+
+    @classmethod
+    def shared(cls) -> "Metrics":
+        """The process‑wide instance, configured from the environment."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.close)
+            return cls._shared
+
+    # ────────────────────────────────────────────────────────────
+    # Console
+    # ────────────────────────────────────────────────────────────
+    def log(self, level: int, message: str) -> None:
+        if level <= self.verbosity:
+            print(message)
+
+    # ────────────────────────────────────────────────────────────
+    # Recording
+    # ────────────────────────────────────────────────────────────
+    def request(self, *, brand: str, endpoint: str, status: str, seconds: float,
+                size: int = 0, rows: int = 0, cached: bool = False) -> None:
+        """One BO page request; ``cached`` ones never hit the wire and skip the latency histogram."""
+        report = self.report_name(endpoint)
+        base = (("brand", brand), ("endpoint", report))
+        with self._lock:
+            self._add("bo_requests_total", base + (("status", status),), 1)
+            self._add("bo_rows_total", base, rows)
+            if cached:
+                self._add("bo_cache_hits_total", base, 1)
+            else:
+                self._add("bo_response_bytes_total", base, size)
+                self._observe(base, seconds)
+        self._event("request", brand=brand, endpoint=report, status=status, seconds=round(seconds, 4),
+                    bytes=size, rows=rows, cached=cached)
+
+    def retry(self, *, brand: str, endpoint: str, reason: str, attempt: int) -> None:
+        labels = (("brand", brand), ("endpoint", self.report_name(endpoint)), ("reason", reason))
+        with self._lock:
+            self._add("bo_retries_total", labels, 1)
+        self._event("retry", brand=brand, endpoint=self.report_name(endpoint), reason=reason, attempt=attempt)
+
+    def stage(self, stage: str, seconds: float, rows: Optional[int] = None, **labels: str) -> None:
+        """Time spent in ``stage`` (accumulated per brand/type); ``rows`` processed, if any."""
+        key = tuple(sorted(labels.items())) + (("stage", stage),)
+        with self._lock:
+            self._add("bo_stage_seconds", key, seconds)
+            if rows is not None:
+                self._add("bo_stage_rows", key, rows)
+        self._event("stage", stage=stage, seconds=round(seconds, 4), rows=rows, **labels)
+
+    def gauge(self, name: str, value: float, **labels: str) -> None:
+        """Set a point‑in‑time value (e.g. a host's current in‑flight limit)."""
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def span(self, stage: str, **labels: str) -> Iterator[Dict[str, Any]]:
+        """Time the block as ``stage``; set ``span["rows"]`` inside it to record a row count."""
+        info: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.stage(stage, time.perf_counter() - started, info.get("rows"), **labels)
+
+    # ────────────────────────────────────────────────────────────
+    # Reading / export
+    # ────────────────────────────────────────────────────────────
+    def stage_seconds(self, **match: str) -> Dict[str, float]:
+        """``{stage: seconds}`` over every recorded span whose labels include ``match``."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                labels_d = dict(labels)
+                if name == "bo_stage_seconds" and all(labels_d.get(k) == v for k, v in match.items()):
+                    totals[labels_d["stage"]] = totals.get(labels_d["stage"], 0.0) + value
+        return totals
+
+    def write_prometheus(self, path: Optional[Path] = None) -> None:
+        path = Path(path) if path else self.prom_path
+        if path is None:
+            return
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        kinds = {
+            "bo_requests_total": ("counter", "BO report requests by status (cache hits included)"),
+            "bo_rows_total": ("counter", "aaData rows received"),
+            "bo_response_bytes_total": ("counter", "BO response body bytes received"),
+            "bo_cache_hits_total": ("counter", "pages served from the local page cache"),
+            "bo_retries_total": ("counter", "failed BO attempts by reason"),
+            "bo_stage_seconds": ("gauge", "seconds spent per stage in this run"),
+            "bo_stage_rows": ("gauge", "rows handled per stage in this run"),
+            "bo_host_in_flight_limit": ("gauge", "AIMD in-flight request limit per BO host"),
+            "bo_http_requests_total": ("counter", "HTTP requests sent per BO host session"),
+            "bo_http_connections_total": ("counter", "TCP connections opened per BO host session"),
+            "bo_http_http2_total": ("counter", "responses received over HTTP/2 per BO host session"),
+        }
+        for name, (kind, help_text) in kinds.items():
+            series = [(labels, value) for (n, labels), value in counters if n == name]
+            if not series:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{self._fmt(labels)} {self._num(value)}" for labels, value in series]
+        if histograms:
+            name = "bo_request_duration_seconds"
+            lines += [f"# HELP {name} BO request latency", f"# TYPE {name} histogram"]
+            for labels, counts in histograms:
+                running = 0
+                for bound, count in zip(self.LATENCY_BUCKETS + ("+Inf",), counts):
+                    running += count
+                    lines.append(f"{name}_bucket{self._fmt(labels + (('le', str(bound)),))} {running}")
+                lines.append(f"{name}_sum{self._fmt(labels)} {self._num(counts[-1])}")
+                lines.append(f"{name}_count{self._fmt(labels)} {running}")
+        lines += ["# HELP bo_run_timestamp_seconds when this run's metrics were written",
+                  "# TYPE bo_run_timestamp_seconds gauge",
+                  f"bo_run_timestamp_seconds {time.time():.0f}",
+                  "# HELP bo_run_duration_seconds wall time of this run so far",
+                  "# TYPE bo_run_duration_seconds gauge",
+                  f"bo_run_duration_seconds {time.time() - self.started_at:.3f}"]
+        try:
+            atomic_write(path, "\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"[metrics] could not write {path} ({e})")
+
+    def flush(self) -> None:
+        """Push buffered JSON lines to disk and refresh the Prometheus textfile."""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.flush()
+        self.write_prometheus()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+    @staticmethod
+    def report_name(endpoint: str) -> str:
+        """Last path segment of a BO endpoint – keeps label cardinality low."""
+        return endpoint.rstrip("/").rsplit("/", 1)[-1]
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _add(self, name: str, labels: Labels, value: float) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, labels: Labels, seconds: float) -> None:
+        counts = self._histograms.setdefault(labels, [0] * (len(self.LATENCY_BUCKETS) + 2))
+        counts[bisect_left(self.LATENCY_BUCKETS, seconds)] += 1
+        counts[-1] += seconds
+
+    def _event(self, event: str, **fields: Any) -> None:
+        if self.jsonl_path is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+        with self._lock:
+            try:
+                if self._jsonl is None:
+                    self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+                self._jsonl.write(line + "\n")
+            except OSError as e:
+                print(f"[metrics] could not write {self.jsonl_path} ({e})")
+                self.jsonl_path = None
+
+    @staticmethod
+    def _fmt(labels: Labels) -> str:
+        if not labels:
+            return ""
+        def escape(value: str) -> str:
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+    @staticmethod
+    def _num(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else f"{value:.6f}"
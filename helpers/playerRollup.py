@@ -0,0 +1,138 @@
+# playerRollup.py
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from helpers.byPlayer import ByPlayer
+
+
+class PlayerRollup:
+    """
+    Per‑affiliate summary of the player report, so the sheets get one row
+    per (affiliate, currency) instead of summing tens of thousands of
+    player rows with formulas.
+
+    Pages are added as they stream in and kept column‑wise (the two key
+    columns, the player names and one float block per page); :meth:`rows`
+    then does the group‑by in NumPy – ``np.unique`` for the groups,
+    ``np.bincount`` for counts and sums, one ``np.lexsort`` for the top
+    players by turnover. Each summary row is::
+
+        sheet_date, "", brand, affiliate_username, currency, players,
+        total_deposit … total_bonus, top players by turnover
+
+    followed by one ``TOTAL`` row per currency. ``PLAYER_ROLLUP_TAB=""``
+    turns the summary off.
+    """
+
+    TAB = os.getenv("PLAYER_ROLLUP_TAB", "*Daily_Rollup (Player)")
+    TOP_N = int(os.getenv("PLAYER_ROLLUP_TOP_N", "3"))
+    SUM_COLUMNS = ("total_deposit", "total_withdrawal", "total_number_of_bets", "total_turnover",
+                   "total_profit_and_loss", "total_bonus")
+    RANK_COLUMN = "total_turnover"
+
+    def __init__(self, columns: Sequence[str] = tuple(ByPlayer.DEFAULT_FIELD_MAP.values()),
+                 top_n: Optional[int] = None):
+        self.columns = tuple(columns)
+        self.top_n = self.TOP_N if top_n is None else top_n
+        self._at = {name: i for i, name in enumerate(self.columns)}
+        self._affiliates: List[Any] = []
+        self._currencies: List[Any] = []
+        self._players: List[Any] = []
+        self._blocks: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    # ────────────────────────────────────────────────────────────
+    # Collecting
+    # ────────────────────────────────────────────────────────────
+    def add_projected(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Add sheet rows as built by :meth:`RowProjector.project_rows` (``columns`` after the 2‑cell prefix)."""
+        self._add([row[2:] for row in rows])
+
+    def add(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Add ``{column: value}`` records (``filter_rows`` output)."""
+        columns = self.columns
+        self._add([tuple(rec.get(c) for c in columns) for rec in records])
+
+    def _add(self, values: List[Sequence[Any]]) -> None:
+        if not values:
+            return
+        at = self._at
+        # transpose once; key and name columns stay Python lists, the rest becomes one float block
+        cols = list(zip(*values))
+        self._affiliates.extend(cols[at["affiliate_username"]])
+        self._currencies.extend(cols[at["currency"]])
+        self._players.extend(cols[at["player_username"]])
+        self._blocks.append(np.column_stack([self._numbers(cols[at[c]]) for c in self.SUM_COLUMNS]))
+
+    @staticmethod
+    def _numbers(column: Sequence[Any]) -> np.ndarray:
+        """One value column as floats; blanks and ``None`` count as 0."""
+        try:
+            out = np.array(column, dtype=float)
+        except (TypeError, ValueError):
+            # the odd formatted string ("1,234.50") – take the slow path for this column only
+            out = np.array([PlayerRollup._number(v) for v in column], dtype=float)
+        return np.nan_to_num(out, copy=False)
+
+    @staticmethod
+    def _number(value: Any) -> float:
+        if value is None or value == "":
+            return 0.0
+        try:
+            return float(str(value).replace(",", ""))
+        except ValueError:
+            return 0.0
+
+    # ────────────────────────────────────────────────────────────
+    # Summarising
+    # ────────────────────────────────────────────────────────────
+    def rows(self, sheet_date: str, brand: str) -> List[List[Any]]:
+        """Summary rows for the sheet, affiliates alphabetically, then the per‑currency totals."""
+        if not self._players:
+            return []
+        values = np.vstack(self._blocks)
+        affiliates = np.array(["" if a is None else str(a) for a in self._affiliates])
+        currencies = np.array(["" if c is None else str(c) for c in self._currencies])
+
+        # group id per player row: (affiliate, currency) pairs, in sorted order
+        aff_names, aff_ids = np.unique(affiliates, return_inverse=True)
+        cur_names, cur_ids = np.unique(currencies, return_inverse=True)
+        pair_ids, group = np.unique(aff_ids * len(cur_names) + cur_ids, return_inverse=True)
+        n_groups = len(pair_ids)
+
+        players = np.bincount(group, minlength=n_groups)
+        sums = np.column_stack([np.bincount(group, weights=values[:, j], minlength=n_groups)
+                                for j in range(values.shape[1])])
+        top = self._top_players(group, n_groups, values[:, self.SUM_COLUMNS.index(self.RANK_COLUMN)])
+
+        prefix = [sheet_date, "", brand]
+        out = []
+        for g, pair in enumerate(pair_ids.tolist()):
+            aff, cur = divmod(pair, len(cur_names))
+            out.append(prefix + [str(aff_names[aff]), str(cur_names[cur]), int(players[g]),
+                                 *np.round(sums[g], 2).tolist(), top[g]])
+
+        # per‑currency totals over every player row
+        cur_players = np.bincount(cur_ids, minlength=len(cur_names))
+        cur_sums = np.column_stack([np.bincount(cur_ids, weights=values[:, j], minlength=len(cur_names))
+                                    for j in range(values.shape[1])])
+        for c, name in enumerate(cur_names.tolist()):
+            out.append(prefix + ["TOTAL", name, int(cur_players[c]), *np.round(cur_sums[c], 2).tolist(), ""])
+        return out
+
+    def _top_players(self, group: np.ndarray, n_groups: int, rank_values: np.ndarray) -> List[str]:
+        """``"name (value), …"`` of each group's ``top_n`` players, highest ``rank_values`` first."""
+        if self.top_n <= 0:
+            return ["" for _ in range(n_groups)]
+        top: List[List[str]] = [[] for _ in range(n_groups)]
+        order = np.lexsort((-rank_values, group))               # by group, then value descending
+        sorted_groups = group[order]
+        starts = np.searchsorted(sorted_groups, np.arange(n_groups))
+        rank = np.arange(len(order)) - starts[sorted_groups]
+        for i in order[rank < self.top_n].tolist():
+            top[group[i]].append(f"{self._players[i]} ({rank_values[i]:,.2f})")
+        return [", ".join(names) for names in top]
@@ -0,0 +1,132 @@
+# rowLedger.py
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from helpers.localFiles import sqlite_connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (spreadsheet TEXT, tab TEXT, key TEXT, hash TEXT, row INTEGER,
+                                 PRIMARY KEY (spreadsheet, tab, key));
+"""
+
+
+class LedgerPlan(NamedTuple):
+    """How one chunk of a tab is written: what to append, what to overwrite, what to leave."""
+    appends: List[Tuple[Optional[str], str, Sequence[Any]]]     # (key, hash, row); key None = untracked
+    updates: List[Tuple[int, str, str, Sequence[Any]]]          # (sheet row, key, hash, row)
+    unchanged: int
+    collisions: int    # rows dropped for a later row of the chunk with the same key
+
+
+class RowLedger:
+    """
+    Where every row the runs wrote lives, and what it held: identity key
+    and content hash per (spreadsheet, tab), with the 1‑based sheet row
+    the append landed on. A rerun for the same date then appends only
+    rows it has never written, rewrites the ones whose content changed (a
+    late BO correction) in place, and skips the rest.
+
+    A row's identity is its scope (the brand) plus the cells the caller
+    names – date, affiliate, currency and, on player tabs, the player.
+    Appends only ever land below a tab's table, so recorded row numbers
+    stay valid as long as nobody sorts or deletes rows by hand; the writer
+    checks a row's identity cells before overwriting it and re‑appends
+    (and re‑records) rows that moved. ``BO_LEDGER_DB=""`` turns the ledger
+    off (plain appends).
+    """
+
+    PATH = os.getenv("BO_LEDGER_DB", "data/row_ledger.sqlite")
+    LOOKUP_CHUNK = 500   # keys per SELECT … IN (…)
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or self.PATH)
+        self._db, self._lock = sqlite_connection(self.path, lambda db: db.executescript(SCHEMA))
+
+    @classmethod
+    def open(cls) -> Optional["RowLedger"]:
+        """The configured ledger, or ``None`` when it is off (or cannot be opened)."""
+        if not cls.PATH:
+            return None
+        try:
+            return cls()
+        except (OSError, sqlite3.Error) as e:
+            print(f"[ledger] unavailable, appending without one ({e})")
+            return None
+
+    @staticmethod
+    def keys(scope: str, rows: Sequence[Sequence[Any]], cells: Sequence[int]) -> List[str]:
+        """Identity key of each row: ``scope`` plus the values at ``cells``."""
+        return ["\x1f".join(str(v) for v in (scope, *(row[i] for i in cells))) for row in rows]
+
+    @staticmethod
+    def digest(row: Sequence[Any]) -> str:
+        body = json.dumps(list(row), separators=(",", ":"), default=str).encode()
+        return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+    # ────────────────────────────────────────────────────────────
+    # Classify → write → record
+    # ────────────────────────────────────────────────────────────
+    def classify(self, spreadsheet: str, tab: str, keys: Sequence[Optional[str]],
+                 rows: Sequence[Sequence[Any]]) -> LedgerPlan:
+        """
+        Split a chunk into new, changed and unchanged rows. A key seen
+        twice in the chunk is written once, with its last content; the rows
+        dropped that way are counted in ``collisions`` – a sign of an
+        identity that is too coarse, or of duplicates upstream.
+        """
+        known = self._lookup(spreadsheet, tab, [k for k in keys if k is not None])
+        appends: List[Tuple[Optional[str], str, Sequence[Any]]] = []
+        updates: Dict[str, Tuple[int, str, str, Sequence[Any]]] = {}
+        pending: Dict[str, int] = {}   # key -> index in appends
+        seen: Set[str] = set()
+        unchanged = collisions = 0
+        for key, row in zip(keys, rows):
+            digest = self.digest(row)
+            if key is None:
+                appends.append((None, digest, row))
+                continue
+            if key in seen:
+                collisions += 1
+            seen.add(key)
+            if key in pending:
+                appends[pending[key]] = (key, digest, row)
+            elif key not in known:
+                pending[key] = len(appends)
+                appends.append((key, digest, row))
+            elif known[key][0] != digest:
+                updates[key] = (known[key][1], key, digest, row)
+            else:
+                updates.pop(key, None)
+                unchanged += 1
+        return LedgerPlan(appends, list(updates.values()), unchanged, collisions)
+
+    def record(self, spreadsheet: str, tab: str, entries: Sequence[Tuple[str, str, int]]) -> None:
+        """Remember ``(key, hash, sheet row)`` of rows that reached the tab."""
+        if not entries:
+            return
+        try:
+            with self._lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?)",
+                                     [(spreadsheet, tab, key, digest, row) for key, digest, row in entries])
+        except sqlite3.Error as e:
+            # an unrecorded row is appended again next run; the sheet write itself stands
+            print(f"[ledger] could not record {len(entries)} rows of {tab} ({e})")
+
+    # ────────────────────────────────────────────────────────────
+    # Internals
+    # ────────────────────────────────────────────────────────────
+    def _lookup(self, spreadsheet: str, tab: str, keys: List[str]) -> Dict[str, Tuple[str, int]]:
+        found: Dict[str, Tuple[str, int]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), self.LOOKUP_CHUNK):
+                chunk = unique[i:i + self.LOOKUP_CHUNK]
+                cur = self._db.execute(
+                    f"SELECT key, hash, row FROM rows WHERE spreadsheet = ? AND tab = ? "
+                    f"AND key IN ({', '.join('?' * len(chunk))})", (spreadsheet, tab, *chunk))
+                found.update((key, (digest, row)) for key, digest, row in cur)
+        return found
@@ -0,0 +1,45 @@
+# helpers/rowProjector.py
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple
+
+
+class RowProjector:
+    """
+    Schema‑driven projection of raw BO ``aaData`` rows.
+
+    ``DEFAULT_FIELD_MAP`` (raw API key -> friendly column name) is the
+    schema; its order is the sheet's column order after the date and the
+    blank column. The map is compiled once into a single ``itemgetter`` so
+    a row is projected by one C‑level call instead of a ``row.get`` per key.
+    """
+
+    # <raw API key> -> <friendly column name>
+    DEFAULT_FIELD_MAP: Dict[str, str] = {}
+
+    def __init__(self, field_map: Dict[str, str] | None = None) -> None:
+        self.field_map = field_map or self.DEFAULT_FIELD_MAP
+        self.raw_keys: Tuple[str, ...] = tuple(self.field_map)
+        self.columns: Tuple[str, ...] = tuple(self.field_map.values())
+        getter = itemgetter(*self.raw_keys)
+        if len(self.raw_keys) == 1:
+            self._getter = lambda row: (getter(row),)
+        else:
+            self._getter = getter
+
+    def values(self, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        """The mapped values of one raw row, in schema order (missing keys -> ``None``)."""
+        try:
+            return self._getter(row)
+        except KeyError:
+            # a short row: fall back to the per‑key lookup
+            return tuple(row.get(raw) for raw in self.raw_keys)
+
+    def filter_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Raw rows -> ``{friendly column: value}`` dicts."""
+        columns, values = self.columns, self.values
+        return [dict(zip(columns, values(row))) for row in rows]
+
+    def project_rows(self, rows: List[Dict[str, Any]], sheet_date: str) -> List[Tuple[Any, ...]]:
+        """Raw rows -> sheet rows: ``(sheet_date, "", *values)`` tuples, ready to append."""
+        prefix, values = (sheet_date, ""), self.values
+        return [prefix + values(row) for row in rows]
@@ -0,0 +1,151 @@
+# sheetPartitions.py
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from googleapiclient.errors import HttpError
+
+# a sheet date (first date of a "dd/mm/yyyy - dd/mm/yyyy" window)
+_DATE = re.compile(r"\s*(\d{2}/\d{2}/\d{4})")
+
+
+class SheetPartitioner:
+    """
+    Time‑partitioning policy for destination tabs: with
+    ``SHEET_PARTITION=month`` rows dated 14/07/2025 for tab ``BAJI`` land
+    in ``BAJI 2025-07``, with ``week`` in ``BAJI 2025-W29`` (ISO week), so
+    no tab grows without limit. The date is a row's first cell, as every
+    writer here lays rows out; rows without one stay in the base tab.
+
+    Partition tabs are created on first write, with the base tab's header
+    row when it has one, and listed in a small index tab
+    (``SHEET_PARTITION_INDEX``, default ``_Partitions``) of the same
+    spreadsheet. The default policy ``none`` writes to the base tab.
+    """
+
+    POLICY = os.getenv("SHEET_PARTITION", "none").strip().lower()
+    INDEX_TAB = os.getenv("SHEET_PARTITION_INDEX", "_Partitions")
+    INDEX_HEADER = ["tab", "partition", "from", "created"]
+    POLICIES = ("none", "month", "week")
+
+    _PARTITION = re.compile(r" \d{4}-(?:\d{2}|W\d{2})$")
+
+    _shared: Optional["SheetPartitioner"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, policy: Optional[str] = None):
+        self.policy = (policy or self.POLICY).strip().lower()
+        if self.policy not in self.POLICIES:
+            raise ValueError(f"SHEET_PARTITION must be one of {', '.join(self.POLICIES)}, not {self.policy!r}")
+        self._tabs: Dict[str, Set[str]] = {}   # spreadsheet -> known tab titles
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "SheetPartitioner":
+        """Process‑wide partitioner, so every writer shares one view of the tabs that exist."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy != "none"
+
+    # ────────────────────────────────────────────────────────────
+    # Routing
+    # ────────────────────────────────────────────────────────────
+    def tab_for(self, tab: str, sheet_date: Any) -> str:
+        """The partition of ``tab`` that rows dated ``sheet_date`` belong in."""
+        if not self.enabled or self._PARTITION.search(tab):
+            return tab          # off, or already a partition
+        m = _DATE.match(str(sheet_date or ""))
+        if not m:
+            return tab
+        try:
+            day = datetime.strptime(m.group(1), "%d/%m/%Y")
+        except ValueError:
+            return tab
+        if self.policy == "month":
+            return f"{tab} {day:%Y-%m}"
+        year, week, _ = day.isocalendar()
+        return f"{tab} {year}-W{week:02d}"
+
+    def split(self, tab: str, rows: Sequence[Sequence[Any]]) -> Dict[str, List[Sequence[Any]]]:
+        """Group ``rows`` by partition tab, keeping their order within each."""
+        if not self.enabled:
+            return {tab: list(rows)}
+        parts: Dict[str, List[Sequence[Any]]] = {}
+        by_date: Dict[Any, str] = {}
+        for row in rows:
+            cell = row[0] if row else None
+            target = by_date.get(cell)
+            if target is None:
+                target = by_date[cell] = self.tab_for(tab, cell)
+            parts.setdefault(target, []).append(row)
+        return parts
+
+    # ────────────────────────────────────────────────────────────
+    # Creating partitions
+    # ────────────────────────────────────────────────────────────
+    def ensure(self, svc, spreadsheet_id: str, tab: str) -> None:
+        """Create partition ``tab`` (and the index tab) unless it exists already; base tabs are left alone."""
+        if not self.enabled or not self._PARTITION.search(tab):
+            return
+        base = self._PARTITION.sub("", tab)
+        with self._lock:
+            try:
+                known = self._known(svc, spreadsheet_id)
+                if tab in known:
+                    return
+                self._add_tab(svc, spreadsheet_id, tab)
+                header = self._header(svc, spreadsheet_id, base, known)
+                if header:
+                    self._values(svc).update(
+                        spreadsheetId=spreadsheet_id, range=f"'{tab}'!A1",
+                        valueInputOption="RAW", body={"values": [header]},
+                    ).execute()
+                if self.INDEX_TAB not in known:
+                    self._add_tab(svc, spreadsheet_id, self.INDEX_TAB)
+                    self._append_index(svc, spreadsheet_id, self.INDEX_HEADER)
+                    known.add(self.INDEX_TAB)
+                self._append_index(svc, spreadsheet_id, [base, tab, tab[len(base):].strip(),
+                                                         datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+            except HttpError as err:
+                raise RuntimeError(f"Could not create partition {tab}: {err}") from err
+            known.add(tab)
+
+    def _known(self, svc, spreadsheet_id: str) -> Set[str]:
+        if spreadsheet_id not in self._tabs:
+            meta = svc.spreadsheets().get(spreadsheetId=spreadsheet_id, fields="sheets.properties.title").execute()
+            self._tabs[spreadsheet_id] = {s["properties"]["title"] for s in meta.get("sheets", [])}
+        return self._tabs[spreadsheet_id]
+
+    @staticmethod
+    def _values(svc):
+        return svc.spreadsheets().values()
+
+    @staticmethod
+    def _add_tab(svc, spreadsheet_id: str, title: str) -> None:
+        svc.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"requests": [{"addSheet": {"properties": {"title": title}}}]},
+        ).execute()
+
+    def _header(self, svc, spreadsheet_id: str, base: str, known: Set[str]) -> Optional[List[Any]]:
+        """The base tab's first row, when it is a header rather than dated data."""
+        if base not in known:
+            return None
+        first = self._values(svc).get(spreadsheetId=spreadsheet_id, range=f"'{base}'!1:1").execute()
+        row = (first.get("values") or [[]])[0]
+        if not row or _DATE.match(str(row[0])):
+            return None
+        return row
+
+    def _append_index(self, svc, spreadsheet_id: str, row: List[Any]) -> None:
+        self._values(svc).append(
+            spreadsheetId=spreadsheet_id, range=f"'{self.INDEX_TAB}'!A1",
+            valueInputOption="RAW", insertDataOption="INSERT_ROWS", body={"values": [row]},
+        ).execute()
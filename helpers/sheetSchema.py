@@ -0,0 +1,164 @@
+# sheetSchema.py
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from googleapiclient.errors import HttpError
+
+from helpers.localFiles import atomic_write
+
+_SHEET_DATE = re.compile(r"\d{2}/\d{2}/\d{4}$")
+_EPOCH = date(1899, 12, 30)   # Sheets serial day 0
+
+
+class SheetSchema:
+    """
+    Cell types of one row layout, so rows can be written ``RAW`` instead
+    of having Google parse every cell as typed text (``USER_ENTERED``).
+
+    :meth:`encode` normalises a batch column by column: ``dd/mm/yyyy``
+    dates become serial day numbers, numeric columns become numbers
+    (``None`` / ``""`` -> empty cell, ``"1,234.50"`` -> ``1234.5``), text
+    passes through untouched. The display formats that make serials look
+    like dates again are sent once per tab (or partition) – see
+    :meth:`ensure_formats` – and remembered in ``SHEET_FORMAT_CACHE``.
+    """
+
+    DATE, TEXT, INT, NUMBER = "date", "text", "int", "number"
+    FORMATS = {
+        DATE: {"type": "DATE", "pattern": "dd/mm/yyyy"},
+        INT: {"type": "NUMBER", "pattern": "0"},
+        NUMBER: {"type": "NUMBER", "pattern": "#,##0.00"},
+    }
+    CACHE = Path(os.getenv("SHEET_FORMAT_CACHE", ".cache/sheet_formats.json"))
+
+    _formatted: Optional[Set[str]] = None
+    _lock = threading.Lock()
+
+    def __init__(self, name: str, types: Sequence[str]):
+        self.name = name
+        self.types = tuple(types)
+
+    # ────────────────────────────────────────────────────────────
+    # Values
+    # ────────────────────────────────────────────────────────────
+    def encode(self, rows: Sequence[Sequence[Any]]) -> List[List[Any]]:
+        """Typed copies of ``rows``; cells past the schema pass through as they are."""
+        if not rows:
+            return []
+        width = max(len(row) for row in rows)
+        columns = list(zip(*(tuple(row) + ("",) * (width - len(row)) for row in rows)))
+        for i, kind in enumerate(self.types[:width]):
+            convert = self._converter(kind)
+            if convert is not None:
+                columns[i] = convert(columns[i])
+        return [list(row) for row in zip(*columns)]
+
+    def _converter(self, kind: str) -> Optional[Callable[[Sequence[Any]], List[Any]]]:
+        if kind == self.DATE:
+            return self._dates
+        if kind in (self.INT, self.NUMBER):
+            return self._numbers
+        return None
+
+    @staticmethod
+    def _dates(column: Sequence[Any]) -> List[Any]:
+        serials: Dict[Any, Any] = {}   # a batch carries one or two distinct dates
+        out = []
+        for value in column:
+            if value not in serials:
+                serials[value] = SheetSchema.serial(value)
+            out.append(serials[value])
+        return out
+
+    @staticmethod
+    def serial(value: Any) -> Any:
+        """Sheets serial number of a ``dd/mm/yyyy`` date; anything else (a window label) unchanged."""
+        if isinstance(value, str) and _SHEET_DATE.match(value):
+            try:
+                return (datetime.strptime(value, "%d/%m/%Y").date() - _EPOCH).days
+            except ValueError:
+                return value
+        return value
+
+    @staticmethod
+    def _numbers(column: Sequence[Any]) -> List[Any]:
+        out = []
+        for value in column:
+            if value is None or value == "":
+                out.append("")
+            elif type(value) in (int, float):
+                out.append(value)
+            else:
+                try:
+                    out.append(float(str(value).replace(",", "")))
+                except ValueError:
+                    out.append(value)   # not a number after all – keep what the BO sent
+        return out
+
+    # ────────────────────────────────────────────────────────────
+    # Formats
+    # ────────────────────────────────────────────────────────────
+    def format_requests(self, sheet_id: int) -> List[Dict[str, Any]]:
+        """``repeatCell`` requests setting each typed column's number format, adjacent alike columns merged."""
+        requests, start = [], 0
+        for i in range(1, len(self.types) + 1):
+            if i < len(self.types) and self.types[i] == self.types[start]:
+                continue
+            fmt = self.FORMATS.get(self.types[start])
+            if fmt is not None:
+                requests.append({"repeatCell": {
+                    "range": {"sheetId": sheet_id, "startColumnIndex": start, "endColumnIndex": i},
+                    "cell": {"userEnteredFormat": {"numberFormat": fmt}},
+                    "fields": "userEnteredFormat.numberFormat",
+                }})
+            start = i
+        return requests
+
+    def ensure_formats(self, svc, spreadsheet_id: str, tab: str) -> None:
+        """Apply this schema's column formats to ``tab`` unless that was done before."""
+        marker = f"{spreadsheet_id}|{tab}|{self.name}"
+        with SheetSchema._lock:
+            if SheetSchema._formatted is None:
+                SheetSchema._formatted = self._read_cache()
+            if marker in SheetSchema._formatted:
+                return
+            try:
+                meta = svc.spreadsheets().get(spreadsheetId=spreadsheet_id,
+                                              fields="sheets.properties(sheetId,title)").execute()
+                ids = {s["properties"]["title"]: s["properties"].get("sheetId") for s in meta.get("sheets", [])}
+                if ids.get(tab) is None:
+                    return
+                svc.spreadsheets().batchUpdate(
+                    spreadsheetId=spreadsheet_id, body={"requests": self.format_requests(ids[tab])},
+                ).execute()
+            except HttpError as err:
+                # formats are cosmetic: the values are already typed
+                print(f"[sheets] could not format {tab} ({err})")
+                return
+            SheetSchema._formatted.add(marker)
+            self._write_cache(SheetSchema._formatted)
+
+    def _read_cache(self) -> Set[str]:
+        try:
+            return set(json.loads(self.CACHE.read_text()))
+        except (OSError, ValueError):
+            return set()
+
+    def _write_cache(self, formatted: Set[str]) -> None:
+        try:
+            atomic_write(self.CACHE, json.dumps(sorted(formatted)))
+        except OSError as e:
+            print(f"[sheets] could not persist format cache ({e})")
+
+
+# row layouts written by main.py / backfill.py (build_*_row, RowProjector.project_rows, PlayerRollup.rows)
+_D, _T, _I, _N = SheetSchema.DATE, SheetSchema.TEXT, SheetSchema.INT, SheetSchema.NUMBER
+PLAYER_ROWS = SheetSchema("player", [_D, _T, _T, _T, _T, _N, _N, _I, _N, _N, _N])
+AFFILIATE_ROWS = SheetSchema("affiliate", [_D, _T, _T, _T, _I, _I, _N, _I, _N, _N, _N, _N, _N])
+AFFILIATE_SOCMED_ROWS = SheetSchema("affiliate_socmed", [_D, _T, _T, _T, _I, _I, _N, _I])
+ROLLUP_ROWS = SheetSchema("rollup", [_D, _T, _T, _T, _T, _I, _N, _N, _I, _N, _N, _N, _T])
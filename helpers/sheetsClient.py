@@ -0,0 +1,87 @@
+# sheetsClient.py
+import json
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import httplib2
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from config.config import Config
+
+
+class SheetsClientFactory:
+    """
+    Process‑wide source of Google Sheets v4 service objects.
+
+    * service‑account credentials are built once per scope set and their
+      access token is shared (refreshed once, under a lock);
+    * the discovery document is read once from a static local copy – the
+      file named by ``SHEETS_DISCOVERY_DOC`` or the one bundled with
+      google‑api‑python‑client – so no discovery fetch ever hits the wire
+      (the same goes for the Drive v3 metadata client);
+    * each thread gets one service bound to its own keep‑alive
+      ``httplib2.Http`` (httplib2 is not thread‑safe), reused for every
+      later call on that thread.
+    """
+
+    SCOPES: Tuple[str, ...] = ("https://www.googleapis.com/auth/spreadsheets",)
+    DRIVE_SCOPES: Tuple[str, ...] = ("https://www.googleapis.com/auth/drive.metadata.readonly",)
+    DISCOVERY_DOC = os.getenv("SHEETS_DISCOVERY_DOC", "")
+    HTTP_TIMEOUT = int(os.getenv("SHEETS_HTTP_TIMEOUT", "120"))
+
+    _lock = threading.Lock()
+    _credentials: Dict[Tuple[str, ...], Credentials] = {}
+    _documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _local = threading.local()
+
+    @classmethod
+    def credentials(cls, scopes: Tuple[str, ...] = SCOPES) -> Credentials:
+        """Shared credentials for ``scopes`` with a valid access token."""
+        with cls._lock:
+            creds = cls._credentials.get(scopes)
+            if creds is None:
+                creds = Credentials.from_service_account_info(Config.as_dict(), scopes=list(scopes))
+                cls._credentials[scopes] = creds
+            if not creds.valid:
+                creds.refresh(Request())
+            return creds
+
+    @classmethod
+    def service(cls, scopes: Tuple[str, ...] = SCOPES):
+        """The calling thread's Sheets service, built on first use."""
+        return cls._thread_service("sheets", "v4", scopes)
+
+    @classmethod
+    def drive(cls):
+        """The calling thread's Drive v3 service (file metadata only)."""
+        return cls._thread_service("drive", "v3", cls.DRIVE_SCOPES)
+
+    @classmethod
+    def _thread_service(cls, api: str, version: str, scopes: Tuple[str, ...]):
+        services = getattr(cls._local, "services", None)
+        if services is None:
+            services = cls._local.services = {}
+        key = (api, version, scopes)
+        svc = services.get(key)
+        if svc is None:
+            http = AuthorizedHttp(cls.credentials(scopes), http=httplib2.Http(timeout=cls.HTTP_TIMEOUT))
+            svc = services[key] = build_from_document(cls._discovery_document(api, version), http=http)
+        return svc
+
+    @classmethod
+    def _discovery_document(cls, api: str = "sheets", version: str = "v4") -> Dict[str, Any]:
+        with cls._lock:
+            if (api, version) not in cls._documents:
+                if api == "sheets" and cls.DISCOVERY_DOC:
+                    with open(cls.DISCOVERY_DOC, encoding="utf-8") as fh:
+                        raw = fh.read()
+                else:
+                    raw = discovery_cache.get_static_doc(api, version)
+                if not raw:
+                    raise RuntimeError(f"No static {api} {version} discovery document available.")
+                cls._documents[(api, version)] = json.loads(raw)
+            return cls._documents[(api, version)]
@@ -1,11 +1,13 @@
 # spreadsheet_controller.py
-from typing import List, Any
-import os, re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import os, re, threading
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.service_account import Credentials
-from config.config import Config
+from helpers.sheetsClient import SheetsClientFactory
+from helpers.metrics import Metrics
+from helpers.rowLedger import RowLedger
+from helpers.sheetPartitions import SheetPartitioner
+from helpers.sheetSchema import SheetSchema
 
 load_dotenv()
 
@@ -24,11 +26,8 @@ class SpreadsheetController:
         self.tab_name = clean_tab
 
         self.type = type
-        creds = Credentials.from_service_account_info(
-            Config.as_dict(),
-            scopes=["https://www.googleapis.com/auth/spreadsheets"],
-        )
-        self.svc = build("sheets", "v4", credentials=creds)
+        self.svc = SheetsClientFactory.service()   # shared, warm client
+        self.partitions = SheetPartitioner.shared()   # SHEET_PARTITION routes rows to dated tabs
 
     # ────────────────── private helpers ──────────────────
     @classmethod
@@ -40,25 +39,6 @@ class SpreadsheetController:
             raise ValueError("Could not parse spreadsheet ID from URL.")
         return m.group(1)
 
-    def _true_last_row(self) -> int:
-        """
-        Return 1‑based index of the first empty row in column A,
-        ignoring gaps inside the column.
-        """
-        col = (
-            self.svc.spreadsheets()
-            .values()
-            .get(
-                spreadsheetId=self.spreadsheet_id,
-                range=f"'{self.tab_name}'!A:A",
-                majorDimension="COLUMNS",
-                valueRenderOption="UNFORMATTED_VALUE",
-            )
-            .execute()
-            .get("values", [[]])[0]
-        )
-        return len(col) + 1
-
     # ────────────────── public methods ───────────────────
     def append_rows_return_last(
         self,
@@ -66,17 +46,39 @@ class SpreadsheetController:
         start_cell: str = "A1",           # kept for API parity, not used
         value_input_option: str = "USER_ENTERED",
         debug: bool = False,
+        schema: Optional[SheetSchema] = None,
     ) -> int:
-        """Append rows and return the final row index."""
+        """
+        Append rows below the existing table and return the first row the
+        API wrote them to. Google locates the end of the table itself, so
+        no column read is needed up front.
+
+        With a partition policy the rows go to the partition tab(s) of
+        their date, created on demand; for rows spanning several
+        partitions the first partition's row is returned.
+
+        With a ``schema`` the rows are sent typed (``RAW``): see
+        :class:`SheetSchema`, whose column formats each tab gets once.
+        """
         if not rows:
             raise ValueError("Nothing to write")
 
-        # find real bottom of the sheet
-        row_start = self._true_last_row()
-        range_a1 = f"'{self.tab_name}'!A{row_start}"
+        first_row = None
+        for tab, part in self.partitions.split(self.tab_name, rows).items():
+            self.partitions.ensure(self.svc, self.spreadsheet_id, tab)
+            if schema is not None:
+                part, value_input_option = schema.encode(part), "RAW"
+            row = self._append(tab, part, value_input_option, debug)
+            if schema is not None:
+                schema.ensure_formats(self.svc, self.spreadsheet_id, tab)   # once per tab; the tab exists now
+            first_row = row if first_row is None else first_row
+        return first_row
+
+    def _append(self, tab: str, rows: List[List[Any]], value_input_option: str, debug: bool) -> int:
+        range_a1 = f"'{tab}'!A1"
 
         if debug:
-            print("[debug] appending to", range_a1)
+            print("[debug] appending", len(rows), "rows to", range_a1)
 
         try:
             resp = (
@@ -102,3 +104,282 @@ class SpreadsheetController:
             print("[debug] updatedRange →", updated_range)
 
         return last_row_after
+
+    def update_rows(
+        self,
+        rows: Dict[int, List[Any]],
+        value_input_option: str = "USER_ENTERED",
+        schema: Optional[SheetSchema] = None,
+    ) -> int:
+        """
+        Overwrite whole rows in place – ``{1‑based row: values}`` – with a
+        single ``values.batchUpdate``; runs of consecutive rows share one
+        range. Rows are located in the partition of their date, like
+        :meth:`append_rows_return_last`, and typed by ``schema`` when given.
+        Returns the number of ranges sent.
+        """
+        if not rows:
+            return 0
+        tab_of = self._tabs_of(rows)
+        if schema is not None:
+            rows = dict(zip(rows, schema.encode(list(rows.values()))))
+            value_input_option = "RAW"
+        data = [{"range": f"'{tab}'!A{first}", "values": [list(rows[row]) for row in run]}
+                for tab, first, run in self._runs(tab_of)]
+
+        try:
+            (
+                self.svc.spreadsheets()
+                .values()
+                .batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"valueInputOption": value_input_option, "data": data},
+                )
+                .execute()
+            )
+        except HttpError as err:
+            raise RuntimeError(f"Sheets update error: {err}") from err
+        return len(data)
+
+    def moved_rows(self, rows: Dict[int, List[Any]], cells: Sequence[int]) -> List[int]:
+        """
+        Of ``{1‑based row: values}`` about to be overwritten, the rows whose
+        ``cells`` no longer hold what ``values`` has there – the tab was
+        sorted, or rows deleted, since they were written. One
+        ``values.batchGet`` over the rows' runs, in the partition of their date.
+        """
+        if not rows or not cells:
+            return []
+        tab_of = self._tabs_of(rows)
+        last_col = self._column(max(cells))
+        runs = list(self._runs(tab_of))
+        try:
+            resp = (
+                self.svc.spreadsheets()
+                .values()
+                .batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=[f"'{tab}'!A{first}:{last_col}{run[-1]}" for tab, first, run in runs],
+                    valueRenderOption="UNFORMATTED_VALUE",
+                )
+                .execute()
+            )
+        except HttpError as err:
+            raise RuntimeError(f"Sheets read error: {err}") from err
+
+        moved = []
+        for (_, _, run), found in zip(runs, resp.get("valueRanges", [])):
+            current = found.get("values", [])
+            for offset, row in enumerate(run):
+                have = current[offset] if offset < len(current) else []
+                want = rows[row]
+                if any(self._cell(have[i] if i < len(have) else "") != self._cell(want[i] if i < len(want) else "")
+                       for i in cells):
+                    moved.append(row)
+        return moved
+
+    def _tabs_of(self, rows: Dict[int, List[Any]]) -> Dict[int, str]:
+        return {row: self.partitions.tab_for(self.tab_name, values[0] if values else None)
+                for row, values in rows.items()}
+
+    @staticmethod
+    def _runs(tab_of: Dict[int, str]) -> Iterator[Tuple[str, int, List[int]]]:
+        """``(tab, first row, rows)`` per run of consecutive rows, tab by tab."""
+        for tab in dict.fromkeys(tab_of.values()):
+            run: List[int] = []
+            for row in sorted(r for r, t in tab_of.items() if t == tab):
+                if run and row != run[-1] + 1:
+                    yield tab, run[0], run
+                    run = []
+                run.append(row)
+            yield tab, run[0], run
+
+    @staticmethod
+    def _column(index: int) -> str:
+        """0‑based column index -> A1 letters."""
+        letters = ""
+        index += 1
+        while index:
+            index, rem = divmod(index - 1, 26)
+            letters = chr(65 + rem) + letters
+        return letters
+
+    @staticmethod
+    def _cell(value: Any) -> str:
+        """A cell as written (date text, number) and as read back unformatted compare equal."""
+        value = SheetSchema.serial(value)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
+
+class BufferedSheetWriter:
+    """
+    Collects rows per (spreadsheet, tab) and writes each tab with a single
+    ``values.append`` on :meth:`flush`. Safe to feed from several brand
+    threads at once; rows of a tab keep the order they were added in.
+
+    With ``chunk_rows`` set, a tab is written as soon as it has buffered
+    that many rows, so a streaming producer never holds more than one
+    chunk per tab.
+
+    ``on_written`` callbacks given to :meth:`add` run once the append that
+    carried those rows succeeded (a checkpoint journal marks its units
+    done from there); rows of a failed append never trigger theirs.
+
+    With a :class:`RowLedger`, rows added with an ``identity`` are
+    written delta‑only: new rows are appended, rows whose content changed
+    are overwritten where they already are, unchanged rows are skipped.
+    ``tally`` counts each per tab. Before an overwrite the target rows'
+    identity cells are read back; a row found elsewhere (the tab was
+    sorted or trimmed by hand) is appended again instead.
+
+    Under a :class:`SheetPartitioner` policy rows are buffered – and
+    reported – per partition tab of their date. Rows added with a
+    :class:`SheetSchema` are written typed, as ``RAW`` values.
+    """
+
+    def __init__(self, *, type: str = "SocialMedia", value_input_option: str = "USER_ENTERED",
+                 chunk_rows: Optional[int] = None, ledger: Optional[RowLedger] = None):
+        self.type = type
+        self.value_input_option = value_input_option
+        self.chunk_rows = chunk_rows
+        self.ledger = ledger
+        self.tally: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._buffers: Dict[Tuple[str, str], List[List[Any]]] = {}
+        self._keys: Dict[Tuple[str, str], List[Optional[str]]] = {}
+        self._schemas: Dict[Tuple[str, str], SheetSchema] = {}
+        self._cells: Dict[Tuple[str, str], Tuple[int, ...]] = {}   # identity cells, checked before in‑place updates
+        self._callbacks: Dict[Tuple[str, str], List[Callable[[], None]]] = {}
+        self._last: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def add(self, spreadsheet: str, tab: str, rows: List[List[Any]],
+            on_written: Optional[Callable[[], None]] = None,
+            identity: Optional[Tuple[str, Tuple[int, ...]]] = None,
+            schema: Optional[SheetSchema] = None) -> None:
+        """
+        Buffer ``rows`` for a tab. ``identity`` is ``(scope, cells)`` – the
+        brand and the cell positions that identify a row (see
+        :meth:`RowLedger.keys`); without it (or a ledger) rows are appended.
+        A tab's rows share one ``schema`` (the last one given).
+        """
+        if not rows:
+            if on_written is not None:
+                on_written()          # nothing to write is written
+            return
+        spreadsheet_id = SpreadsheetController._extract_id(spreadsheet)
+        parts = SheetPartitioner.shared().split(tab.strip().strip("'\""), rows)
+        last = list(parts)[-1]
+        for part_tab, part in parts.items():
+            # the callback rides with the last partition (rows of one date never span two)
+            self._add((spreadsheet_id, part_tab), part, on_written if part_tab == last else None, identity, schema)
+
+    def _add(self, key: Tuple[str, str], rows: List[List[Any]], on_written: Optional[Callable[[], None]],
+             identity: Optional[Tuple[str, Tuple[int, ...]]], schema: Optional[SheetSchema]) -> None:
+        if self.ledger is not None and identity is not None:
+            keys = RowLedger.keys(identity[0], rows, identity[1])
+        else:
+            keys = [None] * len(rows)
+        with self._lock:
+            buffered = self._buffers.setdefault(key, [])
+            buffered.extend(rows)
+            self._keys.setdefault(key, []).extend(keys)
+            if schema is not None:
+                self._schemas[key] = schema
+            if identity is not None:
+                self._cells[key] = tuple(identity[1])
+            if on_written is not None:
+                self._callbacks.setdefault(key, []).append(on_written)
+            if not self.chunk_rows or len(buffered) < self.chunk_rows:
+                return
+            chunk = self._buffers.pop(key)
+            chunk_keys = self._keys.pop(key)
+            callbacks = self._callbacks.pop(key, [])
+        # full chunk: write it now, outside the lock. The chunk may hold other
+        # brands' rows, so a failure is kept for flush() to report against the
+        # tab instead of being raised into whichever producer filled it
+        try:
+            row = self._write(key, chunk, chunk_keys)
+        except Exception as err:
+            with self._lock:
+                self._last[key] = err
+            return
+        with self._lock:
+            if row is not None and not isinstance(self._last.get(key), Exception):
+                self._last[key] = row
+        self._written(callbacks)
+
+    def flush(self, debug: bool = False) -> Dict[Tuple[str, str], Any]:
+        """
+        Write every buffered tab. Returns ``{(spreadsheet_id, tab): row}``
+        where ``row`` is what :meth:`SpreadsheetController.append_rows_return_last`
+        returned for the tab's latest write (chunked writes included),
+        ``None`` when the ledger left nothing to append, or the exception
+        raised by the tab's first failed write – a chunk's included, whose
+        rows' ``on_written`` callbacks never run; one failing tab does not
+        stop the others.
+        """
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            keys, self._keys = self._keys, {}
+            callbacks, self._callbacks = self._callbacks, {}
+            results: Dict[Tuple[str, str], Any] = dict(self._last)
+            self._last = {}
+
+        for key, rows in buffers.items():
+            try:
+                row = self._write(key, rows, keys.get(key), debug)
+                if isinstance(results.get(key), Exception):
+                    pass          # an earlier chunk of this tab failed; keep reporting that
+                elif row is not None or key not in results:
+                    results[key] = row
+            except Exception as err:
+                results[key] = err
+            else:
+                self._written(callbacks.get(key, []))
+        return results
+
+    @staticmethod
+    def _written(callbacks: List[Callable[[], None]]) -> None:
+        for callback in callbacks:
+            callback()
+
+    def _write(self, key: Tuple[str, str], rows: List[List[Any]], keys: Optional[List[Optional[str]]] = None,
+               debug: bool = False) -> Optional[int]:
+        spreadsheet_id, tab = key
+        sheet = SpreadsheetController(spreadsheet=spreadsheet_id, tab=tab, type=self.type)
+        schema = self._schemas.get(key)
+        if self.ledger is None or not keys or not any(keys):
+            return sheet.append_rows_return_last(rows, value_input_option=self.value_input_option, debug=debug,
+                                                 schema=schema)
+
+        plan = self.ledger.classify(spreadsheet_id, tab, keys, rows)
+        appends, updates = plan.appends, plan.updates
+        if plan.collisions:
+            Metrics.shared().log(Metrics.WARN, f"[ledger] {plan.collisions} row(s) of {tab} share their identity with "
+                                               f"a later row of the same chunk; only the last one was kept")
+        if updates:
+            # a row sorted or deleted by hand leaves the ledger pointing at another one
+            moved = set(sheet.moved_rows({row: values for row, _, _, values in updates}, self._cells.get(key, ())))
+            if moved:
+                print(f"[ledger] {len(moved)} row(s) of {tab} are not where they were written; appending them again")
+                appends = appends + [(k, digest, values) for row, k, digest, values in updates if row in moved]
+                updates = [update for update in updates if update[0] not in moved]
+        first = None
+        if appends:
+            first = sheet.append_rows_return_last([row for _, _, row in appends],
+                                                  value_input_option=self.value_input_option, debug=debug,
+                                                  schema=schema)
+            self.ledger.record(spreadsheet_id, tab, [(k, digest, first + i)
+                                                     for i, (k, digest, _) in enumerate(appends) if k is not None])
+        if updates:
+            sheet.update_rows({row: values for row, _, _, values in updates},
+                              value_input_option=self.value_input_option, schema=schema)
+            self.ledger.record(spreadsheet_id, tab, [(k, digest, row) for row, k, digest, _ in updates])
+        with self._lock:
+            tally = self.tally.setdefault(key, {"new": 0, "changed": 0, "unchanged": 0})
+            tally["new"] += len(plan.appends)
+            tally["changed"] += len(plan.updates)
+            tally["unchanged"] += plan.unchanged
+        return first
@@ -0,0 +1,80 @@
+"""
+history.py — query the local history store that every run fills
+
+    python history.py affiliate some_affiliate                  # daily rows, every brand
+    python history.py affiliate some_affiliate --brand BAJI --from 2025-07-01
+    python history.py brand BAJI --from 2025-07-01 --to 2025-07-31
+    python history.py player some_player --json
+    python history.py stats
+
+Dates are YYYY-MM-DD (or the sheets' DD/MM/YYYY). Nothing here touches
+the BO or the Sheets; use ``backfill.py --history-only`` to load past dates.
+"""
+import argparse
+import json
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from helpers.historyStore import HistoryStore
+
+console = Console()
+
+
+def print_rows(rows, title, as_json=False):
+    if as_json:
+        print(json.dumps(rows, indent=2, default=str))
+        return
+    if not rows:
+        console.print(f"[yellow]{title}: no rows")
+        return
+    table = Table(title=title)
+    for column in rows[0]:
+        table.add_column(column, justify="left" if isinstance(rows[0][column], str) else "right")
+    for row in rows:
+        table.add_row(*("" if value is None else str(value) for value in row.values()))
+    console.print(table)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-affiliate / per-brand history from the local store.")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON instead of a table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help in (("affiliate", "one affiliate's daily rows"), ("player", "one player's daily rows")):
+        cmd = sub.add_parser(name, help=help)
+        cmd.add_argument("username")
+        cmd.add_argument("--brand")
+    cmd = sub.add_parser("brand", help="per-day totals of one brand")
+    cmd.add_argument("brand")
+    for name in ("affiliate", "player", "brand"):
+        sub.choices[name].add_argument("--from", dest="start", help="first date")
+        sub.choices[name].add_argument("--to", dest="end", help="last date (inclusive)")
+    sub.add_parser("stats", help="rows and date span per dataset")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = HistoryStore.open()
+    if store is None:
+        raise SystemExit("history store is off (BO_HISTORY_DB is empty)")
+
+    started = time.perf_counter()
+    if args.command == "affiliate":
+        rows = store.affiliate_history(args.username, args.brand, args.start, args.end)
+        title = f"affiliate {args.username}"
+    elif args.command == "player":
+        rows = store.player_history(args.username, args.brand, args.start, args.end)
+        title = f"player {args.username}"
+    elif args.command == "brand":
+        rows = store.brand_history(args.brand, args.start, args.end)
+        title = f"brand {args.brand}"
+    else:
+        rows = [{"dataset": dataset, **stats} for dataset, stats in store.stats().items()]
+        title = f"history store {store.path}"
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print_rows(rows, title, args.json)
+    if not args.json:
+        console.print(f"[dim]{len(rows)} rows in {elapsed_ms:.1f} ms")
@@ -1,16 +1,34 @@
 """
 main.py — fetch SocialMedia first, then Affiliates (full‑field rows)
+
+    python main.py              # fresh run: the day's checkpoint journal starts over
+    python main.py --resume     # pick a failed run up where it stopped
+    python main.py --refresh    # re-fetch pages the page cache holds, to catch BO corrections
+
+Rows are written through the row ledger: running a day again appends
+only rows the sheets don't have yet and rewrites the ones the BO changed.
 """
-import os, json
+import argparse
+import os, json, time
 from datetime import datetime, timedelta
+from functools import partial
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
 from rich.console import Console
 
 from controllers.AcquisitionController import AcquisitionController
 from controllers.SpreadSheetController import SpreadsheetController
-from helpers.spreadsheet_controller import SpreadsheetController as Sheet
+from helpers.spreadsheet_controller import BufferedSheetWriter
+from helpers.metrics import Metrics
+from helpers.checkpointJournal import CheckpointJournal
+from helpers.historyStore import HistoryStore
+from helpers.playerRollup import PlayerRollup
+from helpers.rowLedger import RowLedger
+from helpers.sheetSchema import PLAYER_ROWS, AFFILIATE_ROWS, AFFILIATE_SOCMED_ROWS, ROLLUP_ROWS
+from api.responseCache import ResponseCache
+from api.sessionManager import BoSessionManager
 
 # ────────────────────────── ENV ──────────────────────────
 load_dotenv()
@@ -18,6 +36,10 @@ USERNAME           = os.getenv("BO_USERNAME", "")
 PASSWORD           = os.getenv("BO_PASSWORD", "")
 SOCIAL_SHEET_ID    = os.getenv("SOCIALMEDIA_SHEET", "")
 AFFILIATE_SHEET_ID = os.getenv("AFFILIATE_SHEET", "")
+BRAND_WORKERS      = int(os.getenv("BRAND_WORKERS", "4"))   # brands processed in parallel
+STREAM_CHUNK_ROWS  = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))  # rows per tab before a write goes out
+STREAM_BUFFER_PAGES = int(os.getenv("STREAM_BUFFER_PAGES", "8"))  # BO pages held between fetch and write
+RESUME             = os.getenv("BO_RESUME", "0") == "1"   # same as --resume
 
 if not all([USERNAME, PASSWORD, SOCIAL_SHEET_ID, AFFILIATE_SHEET_ID]):
     raise RuntimeError("Missing BO_USERNAME / BO_PASSWORD / SOCIALMEDIA_SHEET / AFFILIATE_SHEET")
@@ -40,8 +62,13 @@ AFFILIATE_RANGES = {
     "CITINOW": "Acquisition!D1:D",
 }
 
+# sheet cells that identify a row within a brand (see helpers/rowLedger.py)
+PLAYER_IDENTITY    = (0, 2, 3, 4)   # date, affiliate, currency, player
+AFFILIATE_IDENTITY = (0, 2, 3)      # date, affiliate, currency
+ROLLUP_IDENTITY    = (0, 2, 3, 4)   # date, brand, affiliate, currency
+
 # ────────────────────── HELPERS ──────────────────────────
-def build_social_row(rec):
+def build_social_row(rec, sheet_date=sheet_date):
     return [
         sheet_date, "", rec["affiliate_username"], rec["currency"],
         rec["player_username"], rec["total_deposit"], rec["total_withdrawal"],
@@ -49,7 +76,7 @@ def build_social_row(rec):
         rec["total_profit_and_loss"], rec["total_bonus"]
     ]
 
-def build_affiliate_row(rec):
+def build_affiliate_row(rec, sheet_date=sheet_date):
     return [
         sheet_date, "", rec["affiliate_username"], rec["currency"],
         rec["registered_users"], rec["number_of_fd"], rec["first_deposit"],
@@ -58,7 +85,7 @@ def build_affiliate_row(rec):
         rec.get("total_profit_and_loss", ""), rec.get("total_bonus", ""),
     ]
 
-def build_affiliate_row_socmed(rec):
+def build_affiliate_row_socmed(rec, sheet_date=sheet_date):
     return [
         sheet_date, "", rec["affiliate_username"], rec["currency"],
         rec["registered_users"], rec["number_of_fd"], rec["first_deposit"],
@@ -68,21 +95,195 @@ def build_affiliate_row_socmed(rec):
 console = Console(force_terminal=True,
                   force_interactive=True,
                   color_system="truecolor")
+metrics = Metrics.shared()   # spans + BO request stats; BO_VERBOSITY gates the chatter
 
 
-def fetch_dual(type, ac: AcquisitionController, kw, target_date, batch=3):
+def fetch_dual(type, ac: AcquisitionController, kw, target_date, batch=None, end_date=None):
     """Return both Affiliates and SocialMedia data in one dict."""
-    if type == "Affiliates":
-        aff_rows = ac.fetch_bo_batched("Affiliates",  kw, target_date, batch)["data"]                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                
-        return {"data": aff_rows, "socmed_data": []}
+    out = ac.fetch_bo_batched(type, kw, target_date, batch, end_date=end_date)
+    if out.get("status") != 200:
+        raise RuntimeError(out.get("text", "BO fetch failed"))
+    return {"data": out["data"], "socmed_data": out["data_socmed"], "requests": out["requests"]}
+
+def write_brand_rows(brand, type, dest_sheet, tab_name, out, row_builder, row_builder_socmed, sheet_date=sheet_date,
+                     *, writer):
+    """
+    Buffer one fetch_dual result in ``writer`` for the brand's tab (+ the
+    socmed tab, and the player rollup tab on the SocialMedia pass);
+    returns the main rows.
+    """
+    data_aff   = out["data"]          # byPlayer and Affiliates
+    data_soc   = out["socmed_data"]   # socmed affiliates
+
+    main_identity = PLAYER_IDENTITY if type == "SocialMedia" else AFFILIATE_IDENTITY
+    main_schema = PLAYER_ROWS if type == "SocialMedia" else AFFILIATE_ROWS
+
+    def write(tab, rows, cells, schema):
+        writer.add(dest_sheet, tab, rows, identity=(brand, cells), schema=schema)
+
+    metrics.log(Metrics.BATCH, f"[{brand}] Writing rows to spreadsheet…")
+    with metrics.span("transform", brand=brand, type=type) as span:
+        rows = [row_builder(r, sheet_date) for r in data_aff]
+        rows2 = [row_builder_socmed(r, sheet_date) for r in data_soc or []]
+        span["rows"] = len(rows) + len(rows2)
+    with metrics.span("write", brand=brand, type=type) as span:
+        write(tab_name, rows, main_identity, main_schema)
+        # check if it has anything
+        if not rows2:
+            metrics.log(Metrics.BATCH, f"[{brand}] No Social‑Media rows found")
+        else:
+            metrics.log(Metrics.BATCH, f"[{brand}] {len(rows2)} Social‑Media rows")
+            write("*Daily_Data (Aff)", rows2, AFFILIATE_IDENTITY, AFFILIATE_SOCMED_ROWS)
+        span["rows"] = len(rows) + len(rows2)
+    if type == "SocialMedia" and PlayerRollup.TAB and data_aff:
+        rollup = PlayerRollup()
+        rollup.add(data_aff)
+        write(PlayerRollup.TAB, rollup_rows(brand, type, rollup, sheet_date), ROLLUP_IDENTITY, ROLLUP_ROWS)
+    return rows
+
+
+def rollup_rows(brand, type, rollup, sheet_date):
+    """The brand's player rollup as summary rows (the NumPy group‑by runs here)."""
+    with metrics.span("rollup", brand=brand, type=type) as span:
+        rows = rollup.rows(sheet_date, brand)
+        span["rows"] = len(rows)
+    metrics.log(Metrics.BATCH, f"[{brand}] {len(rows)} rollup rows from {len(rollup)} players")
+    return rows
+
+
+def stream_brand_rows(brand, type, ac: AcquisitionController, kw, dest_sheet, tab_name,
+                      target_date=target_date, sheet_date=sheet_date, writer=None, journal=None):
+    """
+    Fetch → project → write one BO page at a time instead of materialising
+    the brand's whole result; ``writer`` sends a tab out every ``chunk_rows``.
+    Rows are projected straight from the raw BO rows into sheet column order
+    (see helpers/rowProjector.py). With a ``journal`` every page is marked
+    written once its append succeeded, and pages it already has in a sheet
+    are not written again. On the SocialMedia pass the player pages also
+    feed the brand's rollup (see helpers/playerRollup.py), written once the
+    stream ended without failed pages. Returns ``{"data": n, "data_socmed": n, "units": [...]}``.
+    """
+    tabs = {"data": tab_name, "data_socmed": "*Daily_Data (Aff)"}
+    identities = {"data": (brand, PLAYER_IDENTITY if type == "SocialMedia" else AFFILIATE_IDENTITY),
+                  "data_socmed": (brand, AFFILIATE_IDENTITY)}
+    schemas = {"data": PLAYER_ROWS if type == "SocialMedia" else AFFILIATE_ROWS,
+               "data_socmed": AFFILIATE_SOCMED_ROWS}
+    counts = {"data": 0, "data_socmed": 0, "units": []}
+    rollup = PlayerRollup() if type == "SocialMedia" and PlayerRollup.TAB else None
+    write_s = 0.0   # buffering, plus any chunk that goes out on this thread
+    for kind, unit, rows in ac.stream_bo_batched(type, kw, target_date, max_buffered_pages=STREAM_BUFFER_PAGES,
+                                                 sheet_date=sheet_date):
+        if rollup is not None and kind == "data":
+            rollup.add_projected(rows)
+        counts["units"].append(unit)
+        if journal is not None and journal.written(unit):
+            continue   # resumed: this page reached its tab in the failed run
+        started = time.perf_counter()
+        on_written = None
+        if journal is not None:
+            on_written = partial(journal.mark_written, unit, dest_sheet, tabs[kind], len(rows))
+        writer.add(dest_sheet, tabs[kind], rows, on_written=on_written, identity=identities[kind],
+                   schema=schemas[kind])
+        write_s += time.perf_counter() - started
+        counts[kind] += len(rows)
+    if rollup is not None and len(rollup):
+        unit = f"rollup|{brand}"
+        counts["units"].append(unit)
+        if ac.failed_pages:
+            # a partial rollup would pass for the day's totals; the resumed run writes it
+            metrics.log(Metrics.INFO, f"[{brand}] rollup skipped: {ac.failed_pages} page(s) failed")
+        elif journal is None or not journal.written(unit):
+            rows = rollup_rows(brand, type, rollup, sheet_date)
+            on_written = None
+            if journal is not None:
+                on_written = partial(journal.mark_written, unit, dest_sheet, PlayerRollup.TAB, len(rows))
+            writer.add(dest_sheet, PlayerRollup.TAB, rows, on_written=on_written, identity=(brand, ROLLUP_IDENTITY),
+                       schema=ROLLUP_ROWS)
+    metrics.stage("write", write_s, counts["data"] + counts["data_socmed"], brand=brand, type=type)
+    if counts["data_socmed"]:
+        metrics.log(Metrics.BATCH, f"[{brand}] {counts['data_socmed']} Social‑Media rows")
     else:
-        aff_rows = ac.fetch_bo_batched("SocialMedia",  kw, target_date, batch)["data"]
-        soc_rows = ac.fetch_bo_batched("SocialMedia", kw, target_date, batch)["data_socmed"]
-        return {"data": aff_rows, "socmed_data": soc_rows}
+        metrics.log(Metrics.BATCH, f"[{brand}] No Social‑Media rows found")
+    return counts
+
+
+def flush_writer(writer):
+    """Flush a BufferedSheetWriter and log one line per destination tab."""
+    with metrics.span("flush", type=writer.type):
+        results = writer.flush(debug=metrics.verbosity >= Metrics.PAGE)
+    for (spreadsheet_id, tab), result in results.items():
+        tally = writer.tally.get((spreadsheet_id, tab))
+        delta = f" ({tally['new']} new, {tally['changed']} updated, {tally['unchanged']} unchanged)" if tally else ""
+        if isinstance(result, Exception):
+            console.log(f"[red]{tab} @ {spreadsheet_id} WRITE ERROR: {result}")
+        elif result is None:
+            console.log(f"[green]{tab} @ {spreadsheet_id}: nothing to append{delta}")
+        else:
+            console.log(f"[green]{tab} @ {spreadsheet_id}: appended from row {result}{delta}")
+
+
+BRAND_STEPS = 3   # keywords → streamed BO fetch + sheet write (two steps)
+
 
-def process_sheet(sheet_id, ranges, row_builder,row_builder_socmed, type, fixed_tab=None):
-    # brand_total = len(ranges)
+def process_brand(progress, brand_task, brand, keywords_job, sheet_id, type, fixed_tab=None, *, writer,
+                  target_date=target_date, sheet_date=sheet_date, journal=None, history=None):
+    """
+    Run one brand end to end, its pages streamed into ``writer``; all
+    other state stays local to this brand. ``keywords_job`` is a future of
+    ``{brand: keywords}``: the BO login runs while the Sheets read is still
+    in flight. Returns the brand's page units if every page was fetched,
+    else ``None``.
+    """
+    if journal is not None and journal.brand_done(brand):
+        console.log(f"[dim]{type} {brand}: already complete in this run's journal, skipped")
+        return None
+    progress.update(brand_task, description=f"[cyan]{type}: {brand} – signing in")
+    data = AcquisitionController(
+        email=USERNAME, password=PASSWORD,
+        currency="all", currency_type=-1,
+        brand=brand, targetdate=target_date, checkpoint=journal, history=history,
+    )
+    if not data._authenticate(type):  # warm the host session; fetch reuses it
+        console.log(f"[red]{brand}: BO sign-in failed, skipped")
+        return
 
+    progress.update(brand_task, description=f"[cyan]{type}: {brand} – keywords")
+    with metrics.span("keywords", brand=brand, type=type):
+        kw = keywords_job.result().get(brand, [])
+    if not kw:
+        console.log(f"[yellow]{brand}: no keywords")
+        return
+    progress.advance(brand_task)
+
+    dest_sheet = kw[1] if len(kw) > 1 else sheet_id
+    tab_name   = fixed_tab or brand
+    metrics.log(Metrics.BATCH, f"[{brand}] fixed_tab: {fixed_tab}, dest_sheet: {dest_sheet}, TabName: {tab_name}")
+
+    # pages are built and handed to the writer as they arrive
+    progress.update(brand_task, description=f"[cyan]{type}: {brand} – streaming")
+    counts = stream_brand_rows(brand, type, data, kw, dest_sheet, tab_name, target_date, sheet_date,
+                               writer=writer, journal=journal)
+    progress.advance(brand_task, 2)
+
+    console.log(f"[green]{brand}: {counts['data']} rows streamed → {tab_name} ({data.requests_made} BO requests)")
+    return counts["units"] if not data.failed_pages else None
+
+
+def process_sheet(sheet_id, ranges, type, fixed_tab=None, workers=BRAND_WORKERS,
+                  target_date=target_date, sheet_date=sheet_date, resume=False):
+    """
+    Run every brand in ``ranges`` on a pool of ``workers`` threads. Progress
+    goes to the pass's checkpoint journal; ``resume`` continues a failed
+    pass from it instead of starting over. Every fetched day is also kept
+    in the local history store (see history.py).
+    """
+    journal = CheckpointJournal.open(type, target_date, sheet_date, resume=resume)
+    history = HistoryStore.open()
+    if journal is not None and resume:
+        done = journal.stats()
+        console.log(f"[cyan]{type}: resuming – {done['brands']} brand(s) done, "
+                    f"{done['writes']} page(s) written, {done['pages']} page(s) journaled")
+    finished = {}   # brand -> page units, for brands whose fetch completed
     with Progress(
         SpinnerColumn(style="green"),
         TextColumn("[bold blue]{task.description}"),
@@ -98,65 +299,93 @@ def process_sheet(sheet_id, ranges, row_builder,row_builder_socmed, type, fixed_
     ) as progress:
 
         task = progress.add_task(f"[white]Processing {type}", total=len(ranges))
+        brand_tasks = {
+            brand: progress.add_task(f"[dim]{type}: {brand} – queued", total=BRAND_STEPS)
+            for brand in ranges
+        }
 
-        for brand, rng in ranges.items():
+        def run(brand):
+            brand_task = brand_tasks[brand]
             try:
-                progress.update(task, description=f"[cyan]{type}: {brand}")
-                
-                kw = SpreadsheetController(sheet_id, rng).get_keywords()
-                if not kw:
-                    console.log(f"[yellow]{brand}: no keywords")
-                    progress.advance(task)
-                    continue
-
-                dest_sheet = kw[1] if len(kw) > 1 else sheet_id
-                tab_name   = fixed_tab or brand
-                print(f"fixed_tab: {fixed_tab}, dest_sheet: {dest_sheet}, TabName: {tab_name}")
-
-                data = AcquisitionController(
-                    email=USERNAME, password=PASSWORD,
-                    currency="all", currency_type=-1,
-                    brand=brand, targetdate=target_date
-                )
-                # .fetch_bo_batched(type, kw, target_date, batch_size=5)["data"]
-                out  = fetch_dual(type, data, kw, target_date)
-                data_aff   = out["data"]          # byPlayer and Affiliates
-                data_soc   = out["socmed_data"]   # socmed affiliates
-
-                # # print(data_aff)
-                print("Writing rows to spreadsheet…................................")
-                rows = [row_builder(r) for r in data_aff]
-                sheet = Sheet(spreadsheet=dest_sheet, tab=tab_name, type=type)
-                sheet.append_rows_return_last(rows, debug=True)
-                print("Done writing rows to spreadsheet.............................")
-                # check if it has anything
-                if not data_soc:             # True for [] or None
-                    print("No Social‑Media rows found")
-                else:
-
-                    print(f"{len(data_soc)} Social‑Media rows")
-                    rows2 = [row_builder_socmed(r) for r in data_soc]
-                    sheet2 = Sheet(spreadsheet=dest_sheet, tab="*Daily_Data (Aff)", type=type)
-                    sheet2.append_rows_return_last(rows2, debug=True)
-                    
-                console.log(f"[green]{brand}: {len(rows)} rows → {tab_name}")
-                
-
+                units = process_brand(progress, brand_task, brand, keywords_job, sheet_id, type, fixed_tab,
+                                      target_date=target_date, sheet_date=sheet_date, writer=writer,
+                                      journal=journal, history=history)
+                if units is not None:
+                    finished[brand] = units
+                progress.update(brand_task, completed=BRAND_STEPS,
+                                description=f"[green]{type}: {brand} – done")
             except Exception as e:
+                # one brand failing never takes the others down
                 console.log(f"[red]{brand} ERROR: {e}")
-
+                progress.update(brand_task, description=f"[red]{type}: {brand} – failed")
             progress.advance(task)  # <- This is what animates the bar
 
+        # rows are buffered per (spreadsheet, tab); a tab goes out every
+        # STREAM_CHUNK_ROWS rows and the remainder once all brands are in
+        writer = BufferedSheetWriter(type=type, chunk_rows=STREAM_CHUNK_ROWS, ledger=RowLedger.open())
+        # every brand's keywords in one batchGet, on its own thread so the
+        # brand workers can sign in to the BO meanwhile
+        with ThreadPoolExecutor(max_workers=1) as sheets_pool, \
+             ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            keywords_job = sheets_pool.submit(SpreadsheetController(sheet_id).get_keywords_batch, ranges)
+            for job in [pool.submit(run, brand) for brand in ranges]:
+                job.result()
+        flush_writer(writer)
+    if journal is not None:
+        # a brand is done once every one of its pages made it into a sheet
+        for brand, units in finished.items():
+            if all(journal.written(unit) for unit in units):
+                journal.finish_brand(brand)
+    log_stage_times(type, ranges)
+    log_transport()
+    metrics.flush()
+
+
+def log_stage_times(type, brands):
+    """One line per brand with where its time went, slowest brand first."""
+    per_brand = {brand: metrics.stage_seconds(brand=brand, type=type) for brand in brands}
+    for brand, stages in sorted(per_brand.items(), key=lambda item: -sum(item[1].values())):
+        if stages:
+            breakdown = " · ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stages.items())
+            console.log(f"[dim]{type} {brand}: {breakdown}")
+
+
+def log_transport():
+    """Keep‑alive health per BO host: requests sent over how many connections."""
+    for host, stats in BoSessionManager.transport_stats().items():
+        if stats["requests"]:
+            reused = 1 - stats["connections"] / stats["requests"]
+            http2 = f", {stats['http2']} over HTTP/2" if stats["http2"] else ""
+            console.log(f"[dim]{host}: {stats['requests']} requests on {stats['connections']} connections "
+                        f"({reused:.0%} reused{http2})")
+
+
+def main(resume=False):
+    # 1️⃣  SocialMedia ➜ fixed tab "*Daily_Data (Player)"
+    process_sheet(
+        SOCIAL_SHEET_ID, SOCIAL_RANGES, "SocialMedia",
+        fixed_tab="*Daily_Data (Player)", resume=resume)
+
+    # 2️⃣  Affiliates ➜ tab derived from range ("Affiliates")
+    #     i.e. "Affiliates!A1:A" → "Affiliates"
+    process_sheet(
+        AFFILIATE_SHEET_ID, AFFILIATE_RANGES,  # fixed_tab=None (default behavior, no fixed tab)
+        type="Affiliates",  # type is not used in this context, but kept for consistency
+        resume=resume,
+    )
+
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch yesterday's BO data into the Sheets.")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip brands and pages the checkpoint journal already has in the sheets")
+    parser.add_argument("--refresh", action="store_true",
+                        help="fetch closed days from the BO even when the page cache has them (BO_CACHE_REFRESH=1)")
+    return parser.parse_args()
 
-# 1️⃣  SocialMedia ➜ fixed tab "*Daily_Data (Player)"
-process_sheet(
-    SOCIAL_SHEET_ID, SOCIAL_RANGES, build_social_row, build_affiliate_row_socmed, "SocialMedia",
-    fixed_tab="*Daily_Data (Player)")
 
-# 2️⃣  Affiliates ➜ tab derived from range ("Affiliates")
-#     i.e. "Affiliates!A1:A" → "Affiliates"
-process_sheet(
-    AFFILIATE_SHEET_ID, AFFILIATE_RANGES, build_affiliate_row, build_affiliate_row_socmed,  # fixed_tab=None (default behavior, no fixed tab)
-    type="Affiliates"  # type is not used in this context, but kept for consistency
-)
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args()
+    if args.refresh:
+        ResponseCache.shared().refresh = True
+    main(resume=RESUME or args.resume)